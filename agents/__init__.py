@@ -1,9 +1,15 @@
 # Agents package
-from agents.scam_detection import scam_detection_agent
-from agents.persona_engagement import persona_engagement_agent
-from agents.intelligence_extraction import intelligence_extraction_agent
-from agents.planner import planner_agent
-from agents.response_formatter import response_formatter_agent
+# Agents are imported lazily (PEP 562) so importing a submodule such as
+# agents.entity_utils does not pull in every agent and its LLM/HTTP deps.
+import importlib
+
+_LAZY_AGENTS = {
+    "scam_detection_agent": "agents.scam_detection",
+    "persona_engagement_agent": "agents.persona_engagement",
+    "intelligence_extraction_agent": "agents.intelligence_extraction",
+    "planner_agent": "agents.planner",
+    "response_formatter_agent": "agents.response_formatter",
+}
 
 __all__ = [
     "scam_detection_agent",
@@ -12,3 +18,16 @@ __all__ = [
     "planner_agent",
     "response_formatter_agent"
 ]
+
+
+def __getattr__(name):
+    module_path = _LAZY_AGENTS.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_path), name)
+    globals()[name] = value  # Cache: later lookups bypass __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,10 +1,127 @@
 import re
-from typing import Dict, List, Any
+import unicodedata
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, List, Any, Optional, Set, TypedDict, Union
 
 
+# Every byte except ASCII 0-9, for bytes.translate(None, delete)
+_NON_DIGIT_BYTES = bytes(b for b in range(256) if not 0x30 <= b <= 0x39)
+
+# One pass over an ID value: optional leading "Case No:" / "Ref #" style label,
+# then external non-alphanumerics (hyphens allowed at the tail); group 1 is the ID.
+# Case-insensitivity is scoped to the label so the trim classes stay ASCII-exact.
+_ID_CLEAN_RE = re.compile(
+    r'^(?:(?i:case|complaint|ticket|ref|reference|policy|pol|order|ord|inv|txn)\s*(?i:no\.?|number|id|#)?[:\-\s]+)?'
+    r'[^a-zA-Z0-9]*(.*?)[^a-zA-Z0-9\-]*$',
+    re.DOTALL,
+)
+
+# Known entity types in merge order: phone_numbers precedes bank_accounts so
+# accounts can be disambiguated against phones as they are inserted
+_ENTITY_TYPES = (
+    "phone_numbers", "bank_accounts", "upi_ids", "phishing_urls", "ifsc_codes",
+    "email_addresses", "case_ids", "policy_numbers", "order_numbers",
+)
+_ENTITY_TYPE_SET = frozenset(_ENTITY_TYPES)
+
+# Common extraction noise words (compared upper-cased)
+NOISE_WORDS = frozenset({
+    "ERENCE", "BENEFITS", "NUMBER", "ERENCES", "DETAILS", "PROCESS",
+    "PENDING", "VALUE", "STATUS", "REFERENCE", "TYPE", "INFORMATION",
+    "CONFIRMATION", "SUPPORT", "REFID", "CASEID", "ORDERID", "POLICYID",
+    "REFNO", "CASENO", "ORDERNO", "POLICYNO", "REFNUMBER", "CASENUMBER",
+    "ORDERNUMBER", "POLICYNUMBER", "REF_ID", "CASE_ID", "ORDER_ID", "POLICY_ID",
+    "ID", "IDS", "CODE", "CODES", "NUM", "NUMS", "EXTRACT", "VERIFY",
+    "DATA", "INFO", "USER", "CUSTOMER", "CLIENT", "AGENT", "ADMIN",
+    "TRANS", "TRANSACTION", "PAYMENT", "AMOUNT", "BILL", "RECEIPT", "INVOICE"
+})
+# Length bounds of NOISE_WORDS: values outside skip the .upper() copy entirely
+_NOISE_MIN_LEN = min(map(len, NOISE_WORDS))
+_NOISE_MAX_LEN = max(map(len, NOISE_WORDS))
+
+
+class EntityRecord(TypedDict):
+    """
+    Canonical entity shape. Kept as a plain dict (not a slots class) because
+    entities live in LangGraph state and are JSON-persisted to session memory.
+    """
+    value: str
+    confidence: float
+    source: str
+
+
+def entity_value(item: Union[EntityRecord, str, None]) -> Optional[str]:
+    """Raw value of an entity item, which may be a record or a bare string."""
+    return item.get("value") if type(item) is dict else item
+
+
+def _digits_only(value: str) -> str:
+    """
+    Keep only the digits, as ASCII. ASCII input takes a single C-level pass;
+    other scripts' decimal digits (e.g. Devanagari) are mapped to 0-9.
+    """
+    if value.isascii():
+        return value.encode("ascii").translate(None, _NON_DIGIT_BYTES).decode("ascii")
+    return "".join([str(unicodedata.decimal(c)) for c in value if c.isdecimal()])
+
+
+def _norm_phone(value: str) -> str:
+    """Phone numbers -> canonical "+91-XXXXXXXXXX", or "" if not 10 digits."""
+    # Strip everything to digits first
+    digits = _digits_only(value)
+    # Normalize to 10-digit core (strip leading 91 / 091 / 0)
+    if len(digits) > 10:
+        if digits.startswith("091"):
+            digits = digits[3:]
+        elif digits.startswith("91"):
+            digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith("0"):
+        digits = digits[1:]
+    # Validate: must be exactly 10 digits
+    if len(digits) != 10:
+        return ""
+    # Always store in canonical +91-XXXXXXXXXX format
+    return f"+91-{digits}"
+
+
+def _norm_bank(value: str) -> str:
+    """Bank accounts -> digits only."""
+    return _digits_only(value)
+
+
+def _norm_id(value: str) -> str:
+    """Case / policy / order IDs: strip labels but LEAVE the ID structure intact."""
+    # Don't force uppercase, allow hyphens
+    # Labels are only stripped at the very beginning when followed by a space/colon/hyphen,
+    # then external non-alphanumerics except trailing hyphens are trimmed
+    clean_val = _ID_CLEAN_RE.match(value).group(1)
+    
+    # Block common extraction noise words (case-insensitive check)
+    if _NOISE_MIN_LEN <= len(clean_val) <= _NOISE_MAX_LEN and clean_val.upper() in NOISE_WORDS:
+        return ""
+        
+    if len(clean_val) < 4 and not any(c.isdigit() for c in clean_val):
+        return ""
+        
+    return clean_val
+
+
+# entity_type -> normalizer; types not listed are only whitespace-stripped
+_NORMALIZERS = {
+    "phone_numbers": _norm_phone,
+    "bank_accounts": _norm_bank,
+    "case_ids": _norm_id,
+    "policy_numbers": _norm_id,
+    "order_numbers": _norm_id,
+}
+
+
+@lru_cache(maxsize=8192)
 def normalize_entity_value(value: str, entity_type: str) -> str:
     """
     Standardize entity values to prevent duplicates (e.g., +91-9876543210 -> 9876543210).
+    Pure on (value, entity_type), so results are memoized across merge cycles.
     """
     if not value:
         return ""
@@ -12,81 +129,39 @@ def normalize_entity_value(value: str, entity_type: str) -> str:
     # Strip whitespace for all
     clean_value = value.strip()
     
-    if entity_type == "phone_numbers":
-        # Strip everything to digits first
-        digits = re.sub(r"\D", "", clean_value)
-        # Normalize to 10-digit core (strip leading 91 / 091 / 0)
-        if len(digits) > 10:
-            if digits.startswith("091"):
-                digits = digits[3:]
-            elif digits.startswith("91"):
-                digits = digits[2:]
-        elif len(digits) == 11 and digits.startswith("0"):
-            digits = digits[1:]
-        # Validate: must be exactly 10 digits
-        if len(digits) != 10:
-            return ""
-        # Always store in canonical +91-XXXXXXXXXX format
-        return f"+91-{digits}"
-    
-    if entity_type == "bank_accounts":
-        # Remove all non-digits and spaces
-        return re.sub(r"\D", "", clean_value)
-    
-    if entity_type in ["case_ids", "policy_numbers", "order_numbers"]:
-        # Strip common labels but LEAVE the actual ID structure intact
-        # Don't force uppercase, allow hyphens
-        clean_val = clean_value
-        
-        # Only strip labels if they are at the very beginning and followed by a space/colon/hyphen
-        clean_val = re.sub(r'(?i)^(?:case|complaint|ticket|ref|reference|policy|pol|order|ord|inv|txn)\s*(?:no\.?|number|id|#)?[:\-\s]+', '', clean_val)
-        
-        # Clean external non-alphanumeric except hyphens
-        clean_val = re.sub(r'^[^a-zA-Z0-9]+|[^a-zA-Z0-9\-]+$', '', clean_val)
-        
-        # Block common extraction noise words (case-insensitive check)
-        NOISE_WORDS = {
-            "ERENCE", "BENEFITS", "NUMBER", "ERENCES", "DETAILS", "PROCESS", 
-            "PENDING", "VALUE", "STATUS", "REFERENCE", "TYPE", "INFORMATION", 
-            "CONFIRMATION", "SUPPORT", "REFID", "CASEID", "ORDERID", "POLICYID",
-            "REFNO", "CASENO", "ORDERNO", "POLICYNO", "REFNUMBER", "CASENUMBER",
-            "ORDERNUMBER", "POLICYNUMBER", "REF_ID", "CASE_ID", "ORDER_ID", "POLICY_ID",
-            "ID", "IDS", "CODE", "CODES", "NUM", "NUMS", "EXTRACT", "VERIFY",
-            "DATA", "INFO", "USER", "CUSTOMER", "CLIENT", "AGENT", "ADMIN",
-            "TRANS", "TRANSACTION", "PAYMENT", "AMOUNT", "BILL", "RECEIPT", "INVOICE"
-        }
-        
-        if clean_val.upper() in NOISE_WORDS:
-            return ""
-            
-        if len(clean_val) < 4 and not any(c.isdigit() for c in clean_val):
-            return ""
-            
-        return clean_val
-        
-    return clean_value
+    normalizer = _NORMALIZERS.get(entity_type)
+    return normalizer(clean_value) if normalizer else clean_value
 
 
-def disambiguate_entities(entities: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+def disambiguate_entities(
+    entities: Dict[str, List[Any]],
+    norm_index: Optional[Dict[str, Set[str]]] = None
+) -> Dict[str, List[Any]]:
     """
     Prevent one value from being assigned to multiple conflicting types.
     Priority: Phone Numbers > Bank Accounts (if 10 digits).
-    """
-    # Extract 10-digit cores from normalized phone values (+91-XXXXXXXXXX -> XXXXXXXXXX)
-    def _phone_core(val: str) -> str:
-        digits = re.sub(r"\D", "", val)
-        return digits[-10:] if len(digits) >= 10 else digits
 
-    phone_cores = {
-        _phone_core(normalize_entity_value(e.get("value") if isinstance(e, dict) else e, "phone_numbers"))
-        for e in entities.get("phone_numbers", [])
-    }
+    When `norm_index` (entity_type -> normalized values) is supplied, the
+    entity values are trusted to be normalized already and nothing is
+    re-normalized here.
+    """
+    if norm_index is not None:
+        # Normalized phones are "+91-XXXXXXXXXX": the core is the last 10 chars
+        phone_cores = {v[-10:] for v in norm_index.get("phone_numbers", ())}
+    else:
+        # normalize_entity_value(_, "phone_numbers") returns "" or "+91-XXXXXXXXXX",
+        # so the 10-digit core is a plain slice (no digit scrub needed)
+        phone_cores = {
+            normalize_entity_value(entity_value(e), "phone_numbers")[-10:]
+            for e in entities.get("phone_numbers", [])
+        }
 
     # Filter bank accounts that are actually phone numbers (10-digit match)
-    if "bank_accounts" in entities:
+    if "bank_accounts" in entities and phone_cores:
         new_bank_list = []
         for item in entities["bank_accounts"]:
-            val = normalize_entity_value(item.get("value") if isinstance(item, dict) else item, "bank_accounts")
+            raw_val = entity_value(item)
+            val = raw_val if norm_index is not None else normalize_entity_value(raw_val, "bank_accounts")
             if len(val) == 10 and val in phone_cores:
                 continue
             new_bank_list.append(item)
@@ -95,16 +170,33 @@ def disambiguate_entities(entities: Dict[str, List[Any]]) -> Dict[str, List[Any]
     return entities
 
 
-def merge_entities(entities_a: Dict, entities_b: Dict) -> Dict:
+def _merge_keys(entities_a: Dict, entities_b: Dict):
+    """Keys present in either dict: known types in _ENTITY_TYPES order, then any extras."""
+    for key in _ENTITY_TYPES:
+        if key in entities_a or key in entities_b:
+            yield key
+    # Rarely taken: keys outside the known entity types
+    for key in entities_a:
+        if key not in _ENTITY_TYPE_SET:
+            yield key
+    for key in entities_b:
+        if key not in _ENTITY_TYPE_SET and key not in entities_a:
+            yield key
+
+
+def merge_entities(entities_a: Dict, entities_b: Dict) -> Dict[str, List[EntityRecord]]:
     """
     Merge two entity dictionaries, combining lists and removing duplicates.
     Handles both dict format ({"value": "..."}) and string format.
-    Applies normalization and disambiguation.
+    Applies normalization and disambiguation in a single pass: phone numbers
+    are merged first, and bank accounts matching a phone's 10-digit core are
+    rejected on insertion (Phone Numbers > Bank Accounts).
     """
     merged = {}
-    all_keys = set(entities_a.keys()) | set(entities_b.keys())
+    phone_cores: Set[str] = set()
     
-    for key in all_keys:
+    # Phones first so bank accounts can be cross-checked as they are inserted
+    for key in _merge_keys(entities_a, entities_b):
         list_a = entities_a.get(key, [])
         list_b = entities_b.get(key, [])
         
@@ -114,26 +206,38 @@ def merge_entities(entities_a: Dict, entities_b: Dict) -> Dict:
         if not isinstance(list_b, list):
             list_b = []
         
-        # Combine lists
-        combined_items = list_a + list_b
-        
-        # Deduplicate and normalize
+        # Deduplicate and normalize (streamed, no concatenated copy)
         seen_normalized = set()
-        deduplicated = []
-        for item in combined_items:
-            raw_val = item.get("value") if isinstance(item, dict) else item
-            norm_val = normalize_entity_value(raw_val, key)
+        deduplicated: List[EntityRecord] = []
+        _seen = seen_normalized.add
+        _append = deduplicated.append
+        needs_normalize = key in _NORMALIZERS
+        check_phones = key == "bank_accounts" and bool(phone_cores)
+        for item in chain(list_a, list_b):
+            # Inlined entity_value(): exact-type check skips the isinstance MRO walk
+            is_record = type(item) is dict
+            raw_val = item.get("value") if is_record else item
+            if needs_normalize:
+                norm_val = normalize_entity_value(raw_val, key)
+            else:
+                # Other types are only whitespace-stripped
+                norm_val = raw_val.strip() if raw_val else ""
             
             if norm_val and norm_val not in seen_normalized:
-                seen_normalized.add(norm_val)
+                _seen(norm_val)
+                # Disambiguate: a 10-digit "account" that is a known phone number
+                if check_phones and len(norm_val) == 10 and norm_val in phone_cores:
+                    continue
                 # Ensure it's in dict format for consistency
-                if isinstance(item, dict):
+                if is_record:
                     item["value"] = norm_val # Use normalized value
-                    deduplicated.append(item)
+                    _append(item)
                 else:
-                    deduplicated.append({"value": norm_val, "confidence": 1.0, "source": "explicit"})
+                    _append({"value": norm_val, "confidence": 1.0, "source": "explicit"})
         
         merged[key] = deduplicated
+        if key == "phone_numbers":
+            # Normalized phones are "+91-XXXXXXXXXX": the core is the last 10 chars
+            phone_cores = {v[-10:] for v in seen_normalized}
     
-    # Final pass: disambiguate types
-    return disambiguate_entities(merged)
+    return merged
@@ -4,12 +4,24 @@ HARDENED: Regex decides IF to fact-check, LLM decides HOW to search.
 """
 
 import re
+import asyncio
+import importlib.util
 import httpx
 import logging
 import json
+import orjson
+from functools import lru_cache
+from itertools import islice
+from operator import mul
 from typing import Dict, Any, List, Optional
 
 from config import get_settings
+from utils.cache import TTLCache
+
+try:
+    import hyperscan  # Optional: multi-pattern DFA scanner for trigger matching
+except ImportError:
+    hyperscan = None
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +77,57 @@ FACT_CHECK_TRIGGERS = [
     r"(?i)(?:mpeb|discom|electricity\s*board)\s*(?:notice|alert)",
 ]
 
+# Literal anchors: every trigger above requires at least one of these
+# (case-folded) substrings, so a message containing none cannot match any
+# trigger and skips the regex scan. Keep in sync when adding triggers.
+FACT_CHECK_ANCHORS = (
+    "kisan", "awas", "mudra", "yojana", "scheme", "modi", "jan", "suraksha", "jeevan",
+    "notice", "alert", "order", "circular", "policy", "guideline", "regulation", "directive",
+    "income", "refund", "pending", "verification", "tax", "offer", "security",
+    "kyc", "pan", "aadhaar", "blocked", "suspended", "frozen", "deactivated",
+    "%", "double", "triple", "quadruple", "guaranteed", "assured", "fixed", "risk", "profit",
+    "lakh", "crore", "million", "billion", "prize", "lottery", "reward", "gift", "draw",
+    "lucky", "winner", "job", "earning", "hiring", "vacancy", "fee",
+    "maturity", "bonus", "claim", "expired", "insurance", "reimbursement", "due", "disconnect",
+)
+
+# Single alternation of all triggers, compiled once: one scan per message
+# instead of one re.search per pattern. The list above stays the source of truth.
+FACT_CHECK_RE = re.compile(
+    "|".join(f"(?:{p.removeprefix('(?i)')})" for p in FACT_CHECK_TRIGGERS),
+    re.IGNORECASE,
+)
+
+
+def _compile_trigger_db():
+    """
+    Compile FACT_CHECK_TRIGGERS into a Hyperscan block-mode database.
+    Returns None when Hyperscan is not installed or rejects a pattern,
+    in which case FACT_CHECK_RE is used instead.
+    """
+    if hyperscan is None:
+        return None
+    flags = (
+        hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH
+        | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+    )
+    try:
+        db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        db.compile(
+            expressions=[p.removeprefix("(?i)").encode("utf-8") for p in FACT_CHECK_TRIGGERS],
+            ids=list(range(len(FACT_CHECK_TRIGGERS))),
+            flags=[flags] * len(FACT_CHECK_TRIGGERS),
+        )
+        return db
+    except Exception as e:
+        logger.warning(f"FACT-CHECK: Hyperscan compile failed, using re fallback - {e}")
+        return None
+
+
+_TRIGGER_DB = _compile_trigger_db()
+# re's \s also matches the ASCII separators \x1c-\x1f, Hyperscan's does not
+_HS_SEPARATOR_TABLE = str.maketrans({c: " " for c in "\x1c\x1d\x1e\x1f"})
+
 # ============================================================================
 # CLAIM EXTRACTION PATTERNS
 # Used to extract specific claims for internet verification
@@ -96,67 +159,214 @@ CLAIM_PATTERNS = [
     (r"(?i)((?:Amazon|Google|Microsoft)\s+(?:hiring|job\s+offer|vacancy))", "job"),
 ]
 
+# Single alternation of all claim patterns, one named group per pattern
+# (g0, g1, ...): one finditer pass per message instead of one per pattern.
+# Unicode classes, as in the individual patterns: \s/\w slots between the claim
+# terms must still match non-breaking spaces and accented words.
+CLAIM_RE = re.compile(
+    "|".join(f"(?P<g{i}>{p.removeprefix('(?i)')})" for i, (p, _) in enumerate(CLAIM_PATTERNS)),
+    re.IGNORECASE,
+)
+CLAIM_GROUP_TYPES = {f"g{i}": claim_type for i, (_, claim_type) in enumerate(CLAIM_PATTERNS)}
+
 
 def should_fact_check(message: str) -> bool:
     """
     DETERMINISTIC check: Should we run internet verification?
     This is the TRUST BOUNDARY - regex decides IF, not LLM.
     """
-    for pattern in FACT_CHECK_TRIGGERS:
-        if re.search(pattern, message):
-            logger.info(f"FACT-CHECK TRIGGER: Pattern matched - {pattern[:50]}")
-            return True
+    # Cheap literal screen first; casefold (plus dotless i, and the combining
+    # dot that casefold leaves after "İ") covers every character the IGNORECASE
+    # triggers would treat as a match. Plain ASCII chat only needs lower().
+    if message.isascii():
+        folded = message.lower()
+    else:
+        folded = message.casefold().replace("ı", "i").replace("\u0307", "")
+    if not any(anchor in folded for anchor in FACT_CHECK_ANCHORS):
+        return False
+
+    # Hyperscan's caseless matching differs from re's Unicode case folding
+    # (e.g. "İ" vs "i"), so it only handles ASCII messages
+    if _TRIGGER_DB is not None and message.isascii():
+        hits: List[int] = []
+        try:
+            # SINGLEMATCH: each trigger reports at most once per scan
+            _TRIGGER_DB.scan(
+                message.translate(_HS_SEPARATOR_TABLE).encode("utf-8"),
+                match_event_handler=lambda pattern_id, start, end, flags, ctx: hits.append(pattern_id),
+            )
+        except Exception as e:
+            logger.warning(f"FACT-CHECK: Hyperscan scan failed, using re fallback - {e}")
+        else:
+            if hits:
+                logger.info(f"FACT-CHECK TRIGGER: Pattern matched - {FACT_CHECK_TRIGGERS[min(hits)][:50]}")
+                return True
+            return False
+
+    match = FACT_CHECK_RE.search(message)
+    if match:
+        logger.info(f"FACT-CHECK TRIGGER: Pattern matched - {match.group(0)[:50]}")
+        return True
     return False
 
 
+# Shared Serper client: keeps TCP+TLS connections to google.serper.dev alive across claims
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+_serper_client: Optional[httpx.AsyncClient] = None
+_serper_client_loop = None
+
+
+def _get_serper_client() -> httpx.AsyncClient:
+    """Get or create the pooled Serper client. Loop-safe for tests."""
+    global _serper_client, _serper_client_loop
+    current_loop = asyncio.get_running_loop()
+    
+    # Pooled connections are bound to the loop that opened them
+    if _serper_client is None or _serper_client.is_closed or _serper_client_loop is not current_loop:
+        _serper_client = httpx.AsyncClient(
+            base_url="https://google.serper.dev",
+            timeout=10.0,
+            # HTTP/2 multiplexes concurrent searches over one connection (needs the h2 extra)
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+        )
+        _serper_client_loop = current_loop
+    return _serper_client
+
+
+async def close_serper_client():
+    """Close the pooled Serper client (called on app shutdown)."""
+    global _serper_client
+    if _serper_client is not None and not _serper_client.is_closed:
+        await _serper_client.aclose()
+    _serper_client = None
+
+
+# Serper results keyed on (query, num_results); recurring claims skip the network
+_SERPER_CACHE = TTLCache(maxsize=10000, ttl=3600)
+# Single-flight: (query, num_results) -> (in-progress batch task, position in batch)
+_serper_inflight: Dict[tuple, tuple] = {}
+# Caps concurrent Serper requests per worker across all conversations
+_serper_semaphore: Optional[asyncio.Semaphore] = None
+_serper_semaphore_loop = None
+
+
+def _get_serper_semaphore() -> asyncio.Semaphore:
+    """Get or create the Serper concurrency cap for the running loop. Loop-safe for tests."""
+    global _serper_semaphore, _serper_semaphore_loop
+    current_loop = asyncio.get_running_loop()
+    if _serper_semaphore is None or _serper_semaphore_loop is not current_loop:
+        _serper_semaphore = asyncio.Semaphore(get_settings().serper_max_concurrency)
+        _serper_semaphore_loop = current_loop
+    return _serper_semaphore
+
+
 async def search_serper(query: str, num_results: int = 3) -> List[Dict[str, Any]]:
     """Search the internet using Serper API."""
+    return (await search_serper_batch([query], num_results))[0]
+
+
+async def search_serper_batch(queries: List[str], num_results: int = 3) -> List[List[Dict[str, Any]]]:
+    """
+    Search several queries in one Serper round trip (TTL-cached, single-flight).
+    Returns one result list per query, aligned with `queries`.
+    """
+    results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+    waiting = {}
+    to_fetch = []
+    
+    for i, query in enumerate(queries):
+        key = (query, num_results)
+        cached = _SERPER_CACHE.get(key)
+        if cached is not None:
+            results[i] = list(cached)
+            continue
+        if key not in _serper_inflight and query not in to_fetch:
+            to_fetch.append(query)
+        waiting[i] = key
+    
+    if to_fetch:
+        batch = asyncio.ensure_future(_fetch_serper_batch(to_fetch, num_results))
+        keys = [(query, num_results) for query in to_fetch]
+        for pos, key in enumerate(keys):
+            _serper_inflight[key] = (batch, pos)
+        
+        def _release(task, keys=keys):
+            for key in keys:
+                if _serper_inflight.get(key, (None,))[0] is task:
+                    del _serper_inflight[key]
+        batch.add_done_callback(_release)
+    
+    # Resolve every (task, position) before awaiting: finished batches release their keys
+    pending = {i: _serper_inflight[key] for i, key in waiting.items()}
+    for i, (task, pos) in pending.items():
+        # Shielded so one cancelled caller does not cancel the shared request
+        results[i] = list((await asyncio.shield(task))[pos])
+    
+    return results
+
+
+async def _fetch_serper_batch(queries: List[str], num_results: int) -> List[List[Dict[str, Any]]]:
+    """Perform one Serper API request for all queries; non-empty results are cached."""
     settings = get_settings()
+    empty = [[] for _ in queries]
     
     if not settings.serper_api_key or settings.serper_api_key == "your_serper_api_key_here":
         logger.warning("FACT-CHECK: Serper API key not configured")
-        return []
+        return empty
+    
+    payload = [
+        {"q": query, "num": num_results, "gl": "in", "hl": "en"}
+        for query in queries
+    ]
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                "https://google.serper.dev/search",
+        async with _get_serper_semaphore():
+            response = await _get_serper_client().post(
+                "/search",
                 headers={
                     "X-API-KEY": settings.serper_api_key,
                     "Content-Type": "application/json"
                 },
-                json={
-                    "q": query,
-                    "num": num_results,
-                    "gl": "in",
-                    "hl": "en"
-                }
+                # Serper accepts a JSON array of searches and answers with an aligned array
+                json=payload if len(payload) > 1 else payload[0]
             )
-            
-            if response.status_code != 200:
-                logger.error(f"Serper API error: {response.status_code}")
-                return []
-            
-            data = response.json()
-            results = []
-            
-            for item in data.get("organic", [])[:num_results]:
-                results.append({
+        
+        if response.status_code != 200:
+            logger.error(f"Serper API error: {response.status_code}")
+            return empty
+        
+        data = orjson.loads(response.content)
+        if isinstance(data, dict):
+            data = [data]
+        
+        batch_results = []
+        for query, entry in zip(queries, data):
+            # Keep only the fields verify_claim uses; islice avoids copying the organic list
+            results = [
+                {
                     "title": item.get("title", ""),
                     "snippet": item.get("snippet", ""),
                     "link": item.get("link", ""),
                     "position": item.get("position", 0)
-                })
-            
-            logger.info(f"FACT-CHECK: Serper returned {len(results)} results")
-            return results
-            
+                }
+                for item in islice(entry.get("organic") or (), num_results)
+            ]
+            if results:
+                _SERPER_CACHE.set((query, num_results), results)
+            batch_results.append(results)
+        # Pad if the API returned fewer entries than queries
+        batch_results.extend([] for _ in range(len(queries) - len(batch_results)))
+        
+        logger.info(f"FACT-CHECK: Serper returned {sum(map(len, batch_results))} results for {len(queries)} queries")
+        return batch_results
+        
     except httpx.TimeoutException:
         logger.warning("FACT-CHECK: Serper API timeout")
-        return []
+        return empty
     except Exception as e:
         logger.error(f"FACT-CHECK: Serper error - {e}")
-        return []
+        return empty
 
 
 def extract_claims_from_message(message: str) -> List[Dict[str, str]]:
@@ -164,28 +374,33 @@ def extract_claims_from_message(message: str) -> List[Dict[str, str]]:
     Extract verifiable claims using REGEX (deterministic).
     Returns claims with their type for better search queries.
     """
-    claims = []
-    
-    for pattern, claim_type in CLAIM_PATTERNS:
-        matches = re.findall(pattern, message)
-        for match in matches:
-            if len(match) > 10:
-                claims.append({
-                    "text": match.strip(),
-                    "type": claim_type
-                })
-    
-    # Deduplicate
-    seen = set()
-    unique = []
-    for claim in claims:
-        key = claim["text"].lower()
-        if key not in seen:
-            seen.add(key)
-            unique.append(claim)
-    
-    logger.info(f"FACT-CHECK: Extracted {len(unique)} claims")
-    return unique[:3]  # Limit to 3
+    # Deduplicate on lowercased text while extracting; first-seen claim wins
+    claims: Dict[str, Dict[str, str]] = {}
+    
+    for m in CLAIM_RE.finditer(message):
+        match = m.group(m.lastgroup)
+        if len(match) > 10:
+            text = match.strip()
+            claims.setdefault(text.lower(), {
+                "text": text,
+                "type": CLAIM_GROUP_TYPES[m.lastgroup]
+            })
+    
+    logger.info(f"FACT-CHECK: Extracted {len(claims)} claims")
+    return list(claims.values())[:3]  # Limit to 3
+
+
+# Type-specific search suffixes
+SEARCH_QUERY_SUFFIXES = {
+    "scheme": "official government OR scam OR fake",
+    "regulation": "official RBI OR scam OR hoax",
+    "bank": "official bank OR scam OR phishing",
+    "kyc": "scam OR fraud OR fake",
+    "investment": "scam OR fraud OR ponzi OR fake",
+    "tax": "official income tax OR scam OR fraud",
+    "prize": "scam OR fraud OR fake lottery",
+    "job": "scam OR fraud OR fake job",
+}
 
 
 def build_search_query(claim: Dict[str, str]) -> str:
@@ -193,36 +408,51 @@ def build_search_query(claim: Dict[str, str]) -> str:
     Build search query from claim.
     LLM is NOT used here - deterministic query building based on claim type.
     """
-    text = claim["text"]
-    claim_type = claim["type"]
-    
-    # Type-specific search suffixes
-    suffixes = {
-        "scheme": "official government OR scam OR fake",
-        "regulation": "official RBI OR scam OR hoax",
-        "bank": "official bank OR scam OR phishing",
-        "kyc": "scam OR fraud OR fake",
-        "investment": "scam OR fraud OR ponzi OR fake",
-        "tax": "official income tax OR scam OR fraud",
-        "prize": "scam OR fraud OR fake lottery",
-        "job": "scam OR fraud OR fake job",
-    }
-    
-    suffix = suffixes.get(claim_type, "scam OR fraud OR fake")
+    return _build_search_query(claim["text"], claim["type"])
+
+
+@lru_cache(maxsize=4096)
+def _build_search_query(text: str, claim_type: str) -> str:
+    # Collapse internal whitespace so equivalent claims share one Serper cache key
+    text = " ".join(text.split())
+    suffix = SEARCH_QUERY_SUFFIXES.get(claim_type, "scam OR fraud OR fake")
     return f"{text} {suffix}"
 
 
 TRUSTED_DOMAIN_SUFFIXES = [".gov.in", ".nic.in", "rbi.org.in", "incometax.gov.in"]
+# Trusted when a suffix ends the link or is followed by a path: one scan per link
+TRUSTED_DOMAIN_RE = re.compile(
+    "(?:" + "|".join(map(re.escape, TRUSTED_DOMAIN_SUFFIXES)) + r")(?:/|\Z)"
+)
+RED_FLAG_TLDS = (".xyz", ".top", ".site", ".online", ".zip")
+# Rank weighting: top results have more weight (1.0, 0.8, 0.6, 0.4, then 0.2)
+RANK_WEIGHTS = tuple(max(0.2, 1.0 - (i * 0.2)) for i in range(5))
 SCAM_INDICATOR_KEYWORDS = ["scam", "fraud", "fake", "warning", "beware", "alert", "hoax", "phishing", "malicious"]
 LEGIT_INDICATOR_KEYWORDS = ["official", "government", "authorized", "genuine", "original"]
 
-async def verify_claim(claim: Dict[str, str]) -> Dict[str, Any]:
+# One C-level scan per result instead of a Python `in` per keyword. The
+# lookahead reports overlapping hits so counting distinct (lowercased) matches
+# gives the same "keywords present" count as the substring checks did.
+# Case-insensitive matching means result text is never lowercased as a whole.
+SCAM_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, SCAM_INDICATOR_KEYWORDS)) + "))", re.IGNORECASE | re.ASCII
+)
+LEGIT_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, LEGIT_INDICATOR_KEYWORDS)) + "))", re.IGNORECASE | re.ASCII
+)
+
+async def verify_claim(
+    claim: Dict[str, str],
+    results: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
     """
     Verify a single claim using internet search.
     HARDENED: Domain trust → Rank weighting → Confidence score.
+    Pass `results` when the search was already done (batched by fact_check_message).
     """
-    query = build_search_query(claim)
-    results = await search_serper(query, num_results=5) # More results for better data
+    if results is None:
+        query = build_search_query(claim)
+        results = await search_serper(query, num_results=5) # More results for better data
     
     if not results:
         return {
@@ -235,62 +465,52 @@ async def verify_claim(claim: Dict[str, str]) -> Dict[str, Any]:
             "sources": []
         }
     
-    scam_score = 0.0
-    legit_score = 0.0
+    # Per-result evidence first, then one rank-weighted dot product per score
+    scam_evidence = []
+    legit_evidence = []
     sources = []
     
-    for i, result in enumerate(results):
-        # Rank weighting: top results have more weight (1.0, 0.8, 0.6, etc.)
-        rank_weight = max(0.2, 1.0 - (i * 0.2))
-        
-        text = (result["title"] + " " + result["snippet"]).lower()
+    for result in results:
+        text = result["title"] + " " + result["snippet"]
+        # Lowercased once: both the trusted-domain and red-flag TLD checks use it
         link = result["link"].lower()
         
         # 1. Domain Trust Scoring (High Authority)
-        domain_legit = False
-        for suffix in TRUSTED_DOMAIN_SUFFIXES:
-            # Strict domain matching to prevent spoofing (e.g., mysite.gov.in.xyz)
-            if link.endswith(suffix) or f"{suffix}/" in link:
-                legit_score += 5.0 * rank_weight
-                domain_legit = True
-                break
+        # Strict domain matching to prevent spoofing (e.g., mysite.gov.in.xyz)
+        domain_legit = TRUSTED_DOMAIN_RE.search(link) is not None
         
         # 2. Keyword Scoring (Low Authority - easily gamed)
-        for kw in SCAM_INDICATOR_KEYWORDS:
-            if kw in text:
-                scam_score += 1.0 * rank_weight
-                
-        for kw in LEGIT_INDICATOR_KEYWORDS:
-            if kw in text:
-                # If it's a trusted domain, don't double count much, but reinforce
-                legit_score += (0.5 if domain_legit else 1.0) * rank_weight
+        scam_hits = len({hit.lower() for hit in SCAM_KEYWORD_RE.findall(text)})
+        legit_hits = len({hit.lower() for hit in LEGIT_KEYWORD_RE.findall(text)})
         
         # 3. Domain Red Flags
-        if any(link.endswith(ext) for ext in [".xyz", ".top", ".site", ".online", ".zip"]):
-             scam_score += 1.0 * rank_weight
+        red_flag = 1 if link.endswith(RED_FLAG_TLDS) else 0
+        
+        scam_evidence.append(scam_hits + red_flag)
+        # If it's a trusted domain, don't double count keywords much, but reinforce
+        legit_evidence.append(5.0 + legit_hits * 0.5 if domain_legit else legit_hits)
 
         sources.append({
             "title": result["title"][:100],
             "url": result["link"]
         })
     
+    weights = RANK_WEIGHTS + (RANK_WEIGHTS[-1],) * (len(results) - len(RANK_WEIGHTS))
+    scam_score = sum(map(mul, weights, scam_evidence))
+    legit_score = sum(map(mul, weights, legit_evidence))
+    
     # Calculate Confidence (0-1)
     # Based on the margin between scores normalized by total evidence
     total_score = scam_score + legit_score
-    if total_score > 0:
-        margin = abs(scam_score - legit_score)
-        confidence = min(1.0, margin / (total_score * 0.5 + 1.0))
-    else:
-        confidence = 0.0
+    diff = scam_score - legit_score
+    confidence = min(1.0, abs(diff) / (total_score * 0.5 + 1.0)) if total_score > 0 else 0.0
 
-    # Determine verdict
-    margin = abs(scam_score - legit_score)
-    
-    if scam_score > legit_score + 1.5:
+    # Determine verdict (single ladder on the signed margin)
+    if diff > 1.5:
         status = "LIKELY_SCAM"
         verified = False
         reason = f"Strong scam indicators found ({scam_score:.1f} vs {legit_score:.1f})"
-    elif legit_score > scam_score + 1.5:
+    elif diff < -1.5:
         status = "POSSIBLY_LEGITIMATE"
         verified = True
         reason = f"Verified via official or authoritative sources ({legit_score:.1f} vs {scam_score:.1f})"
@@ -345,9 +565,10 @@ async def fact_check_message(message: str) -> Dict[str, Any]:
             "results": []
         }
     
-    # STEP 3: Verify each claim via internet
-    import asyncio
-    tasks = [verify_claim(claim) for claim in claims]
+    # STEP 3: Verify each claim via internet (all claim searches in one Serper round trip)
+    queries = [build_search_query(claim) for claim in claims]
+    search_results = await search_serper_batch(queries, num_results=5)
+    tasks = [verify_claim(claim, results) for claim, results in zip(claims, search_results)]
     results = await asyncio.gather(*tasks, return_exceptions=True)
     
     # Filter exceptions
@@ -4,23 +4,52 @@ Extracts and verifies entities from conversation history using Regex and LLM.
 """
 
 import re
+import asyncio
 import logging
 import json
-from typing import Dict, Any, List
+import hashlib
+from collections import deque
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+try:
+    import ahocorasick  # Optional: one-pass multi-value search for LLM validation
+except ImportError:
+    ahocorasick = None
 
 from config import get_settings
 from utils.parsing import parse_json_safely
-from utils.prefilter import (
-    extract_entities_deterministic,
-    filter_low_confidence,
-)
-from agents.entity_utils import merge_entities, normalize_entity_value, disambiguate_entities
+from utils.prefilter import extract_entities_from_messages
+from agents.entity_utils import merge_entities, normalize_entity_value, disambiguate_entities, entity_value
 from utils.llm_client import call_llm_async
+from utils.logger import AgentLogger
+from utils.cache import TTLCache
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
+# Raw LLM verification responses keyed on a digest of the full prompt
+# (conversation window + regex candidates); replays skip the LLM call
+_VERIFY_CACHE = TTLCache(maxsize=1000, ttl=3600)
+
+# In-flight verification call per conversation_id; a newer turn cancels it.
+# Only matters without Postgres: with it, capture_session_lock serializes a
+# conversation's turns, so two verifications for one session never overlap.
+_inflight_verifications: Dict[str, asyncio.Task] = {}
+
+# Verification context budget. Longer windows are cut down to the spans around
+# entity-like tokens (digits, "@", spelled-out digits and separators) plus some context.
+VERIFY_CONTEXT_CHARS = 3000
+VERIFY_CONTEXT_PAD = 80
+_ENTITY_HINT_RE = re.compile(
+    r"[@0-9][\w@.\-/]{3,}|\b(?:zero|one|two|three|four|five|six|seven|eight|nine)\b",
+    re.IGNORECASE,
+)
+_SPAN_SEPARATOR = "\n...\n"
+# Spelled-out separators ("name at okaxis", "gmail dot com") only the LLM can resolve
+_OBFUSCATION_HINT_RE = re.compile(r"\b(?:at|dot)\b", re.IGNORECASE)
+
+
 # Required Entity Types
 
 EXPECTED_ENTITY_KEYS = {
@@ -108,7 +137,8 @@ async def intelligence_extraction_agent(state: Dict[str, Any]) -> Dict[str, Any]
     full_corpus = "\n".join(scammer_turns)
 
     # ── STEP 1: Deterministic Regex on FULL corpus ────────────────────────────
-    new_regex_entities = extract_entities_deterministic(full_corpus)
+    # Per-turn results are memoized, so only the newest turn is actually scanned
+    new_regex_entities = extract_entities_from_messages(scammer_turns)
 
     # Also run on initial prefilter entities if first turn
     if len(conversation_history) <= 1:
@@ -117,64 +147,88 @@ async def intelligence_extraction_agent(state: Dict[str, Any]) -> Dict[str, Any]
             new_regex_entities = merge_entities(new_regex_entities, prefilter_entities)
 
     # ── STEP 2: LLM Verification ──────────────────────────────────────────────
-    try:
-        # Use a capped window (last 6 turns) to avoid token overflow
-        window = conversation_history[-6:]
-        combined_text = "\n".join(
-            t["message"].replace("{", "").replace("}", "")[:600]
-            for t in window
-            if t.get("message")
-        )
-        # Always include original message
-        if original and original not in combined_text:
-            combined_text = original + "\n" + combined_text
-
-        prompt = LLM_VERIFY_PROMPT.format(
-            conversation=combined_text[:3000],
-            regex_entities=_format_entities_for_prompt(new_regex_entities)
-        )
-
-        response_text = await call_llm_async(
-            prompt=prompt,
-            system_instruction="Verify and recover entities strictly from the conversation. Return JSON only.",
-            json_mode=True,
-            agent_name="extraction",
-        )
-
-        llm_result = parse_json_safely(response_text) or {}
-        new_llm_entities = llm_result.get("verified_entities", {})
-
-        # Schema enforcement — only allow known entity types
-        new_llm_entities = _enforce_schema(new_llm_entities)
-
-        # Anti-hallucination: validate every LLM entity is actually in the text
-        # (Allows slight normalization like stripping labels)
-        new_llm_entities = _validate_llm_output_against_text(
-            new_llm_entities, full_corpus + "\n" + combined_text
-        )
-
-        # FULL RECOVERY: always merge regex entities -- regex already ran on the
-        # full validated corpus so no further text check is needed.
-        for key in EXPECTED_ENTITY_KEYS:
-            llm_vals = {str(i.get("value", i) if isinstance(i, dict) else i).lower() for i in new_llm_entities.get(key, [])}
-            for candidate in new_regex_entities.get(key, []):
-                val = str(candidate.get("value", candidate) if isinstance(candidate, dict) else candidate).lower()
-                if val and val not in llm_vals:
-                    new_llm_entities[key].append(candidate)
-
-        combined_new_entities = new_llm_entities
-
-    except Exception as e:
-        logger.warning(f"LLM verification failed: {e}")
-        # Fallback to regex if LLM fails completely
+    existing_entities = state.get("extracted_entities", {}) or {}
+    prior_keys = _normalized_entity_keys(existing_entities)
+    latest_turn = scammer_turns[-1]
+    if (
+        prior_keys
+        and _normalized_entity_keys(new_regex_entities) <= prior_keys
+        and not _ENTITY_HINT_RE.search(latest_turn)
+        and not _OBFUSCATION_HINT_RE.search(latest_turn)
+    ):
+        # Nothing new since the last turn, and nothing the regex could have
+        # missed in the newest one: skip the LLM round-trip
+        logger.debug("EXTRACTION: No new regex entities, skipping LLM verification")
         combined_new_entities = new_regex_entities
+    else:
+        try:
+            # Use a capped window (last 6 turns) to avoid token overflow
+            window = conversation_history[-6:]
+            combined_text = "\n".join(
+                t["message"].replace("{", "").replace("}", "")[:600]
+                for t in window
+                if t.get("message")
+            )
+            # Always include original message
+            if original and original not in combined_text:
+                combined_text = original + "\n" + combined_text
+
+            prompt = LLM_VERIFY_PROMPT.format(
+                conversation=_relevant_context(combined_text),
+                regex_entities=_format_entities_for_prompt(new_regex_entities)
+            )
+
+            cache_key = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest()
+            response_text = _VERIFY_CACHE.get(cache_key)
+            if response_text is None:
+                response_text = await _call_verifier(state.get("conversation_id") or "", prompt)
+                if response_text is None:
+                    # Superseded by a newer turn of this conversation, which re-extracts
+                    return {"current_agent": "planner"}
+                _VERIFY_CACHE.set(cache_key, response_text)
+
+            llm_result = parse_json_safely(response_text) or {}
+            new_llm_entities = llm_result.get("verified_entities", {})
+
+            # Schema enforcement — only allow known entity types
+            new_llm_entities = _enforce_schema(new_llm_entities)
+
+            regex_keys = {
+                (key, str(entity_value(i)).lower())
+                for key, items in new_regex_entities.items() for i in items
+            }
+            # If the LLM only echoed regex candidates, those are already in the
+            # corpus: keep its records (and confidences) without re-validating
+            if not all(
+                (key, str(entity_value(i)).lower()) in regex_keys
+                for key, items in new_llm_entities.items() for i in items
+            ):
+                # Anti-hallucination: validate every LLM entity is actually in the text
+                # (Allows slight normalization like stripping labels)
+                new_llm_entities = _validate_llm_output_against_text(
+                    new_llm_entities, full_corpus + "\n" + combined_text
+                )
+
+            # FULL RECOVERY: always merge regex entities -- regex already ran on the
+            # full validated corpus so no further text check is needed.
+            for key in EXPECTED_ENTITY_KEYS:
+                llm_vals = {str(i.get("value", i) if isinstance(i, dict) else i).lower() for i in new_llm_entities.get(key, [])}
+                for candidate in new_regex_entities.get(key, []):
+                    val = str(candidate.get("value", candidate) if isinstance(candidate, dict) else candidate).lower()
+                    if val and val not in llm_vals:
+                        new_llm_entities[key].append(candidate)
+
+            combined_new_entities = new_llm_entities
+
+        except Exception as e:
+            logger.warning(f"LLM verification failed: {e}")
+            # Fallback to regex if LLM fails completely
+            combined_new_entities = new_regex_entities
 
     # ── STEP 3: Normalize + Confidence Filter ────────────────────────────────
-    combined_new_entities = _normalize_entities(combined_new_entities)
-    combined_new_entities = filter_low_confidence(combined_new_entities, threshold=0.6)
+    combined_new_entities = _normalize_entities(combined_new_entities, threshold=0.6)
 
     # ── STEP 4: Merge with Prior Entities ────────────────────────────────────
-    existing_entities = state.get("extracted_entities", {}) or {}
     final_entities = merge_entities(existing_entities, combined_new_entities)
 
     # Schema enforcement — guarantee all 8 keys exist
@@ -183,7 +237,6 @@ async def intelligence_extraction_agent(state: Dict[str, Any]) -> Dict[str, Any]
     # ── STEP 5: Set-based Global Deduplication ────────────────────────────────
     final_entities = _deduplicate_all(final_entities)
 
-    from utils.logger import AgentLogger
     merged_details = (
         f"Prior={_count_entities(existing_entities)}, "
         f"New={_count_entities(combined_new_entities)}, "
@@ -197,6 +250,90 @@ async def intelligence_extraction_agent(state: Dict[str, Any]) -> Dict[str, Any]
     }
 
 
+async def _call_verifier(conversation_id: str, prompt: str) -> Optional[str]:
+    """
+    Run the verification LLM call as the conversation's in-flight task,
+    cancelling any older one still running for the same conversation.
+    Returns None if this call is itself superseded before it completes.
+    """
+    previous = _inflight_verifications.get(conversation_id)
+    if previous is not None and not previous.done():
+        previous.cancel()
+
+    task = asyncio.create_task(call_llm_async(
+        prompt=prompt,
+        system_instruction="Verify and recover entities strictly from the conversation. Return JSON only.",
+        json_mode=True,
+        agent_name="extraction",
+    ))
+    _inflight_verifications[conversation_id] = task
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            raise  # The caller itself is being cancelled
+        logger.info(f"EXTRACTION: Verification superseded for conversation {conversation_id[:8]}")
+        return None
+    finally:
+        if _inflight_verifications.get(conversation_id) is task:
+            del _inflight_verifications[conversation_id]
+
+
+def _relevant_context(text: str) -> str:
+    """
+    Trim the verification text to the spans around entity-like tokens, filling
+    the budget from the most recent spans back. Texts within the budget are sent
+    whole; longer texts with no such tokens keep the head slice.
+    """
+    if len(text) <= VERIFY_CONTEXT_CHARS:
+        return text
+
+    anchors = sorted(
+        [*_ENTITY_HINT_RE.finditer(text), *_OBFUSCATION_HINT_RE.finditer(text)],
+        key=lambda m: m.start()
+    )
+    spans = []
+    for match in anchors:
+        start = max(0, match.start() - VERIFY_CONTEXT_PAD)
+        end = min(len(text), match.end() + VERIFY_CONTEXT_PAD)
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end)  # Merge overlapping windows
+        else:
+            spans.append([start, end])
+
+    if not spans:
+        return text[:VERIFY_CONTEXT_CHARS]
+
+    # Fill the budget from the newest spans back: late turns carry the entities
+    # most likely to be new. The span that overflows keeps its tail up to the budget.
+    kept = deque()
+    budget = VERIFY_CONTEXT_CHARS
+    for start, end in reversed(spans):
+        if kept:
+            budget -= len(_SPAN_SEPARATOR)
+        if budget <= 0:
+            break
+        if end - start > budget:
+            kept.appendleft(text[end - budget:end])
+            break
+        kept.appendleft(text[start:end])
+        budget -= end - start
+    return _SPAN_SEPARATOR.join(kept)
+
+
+def _normalized_entity_keys(entities: Dict) -> Set[Tuple[str, str]]:
+    """(entity_type, normalized value) pairs, for comparing entity sets across turns."""
+    keys = set()
+    for entity_type, items in entities.items():
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            norm_val = normalize_entity_value(str(entity_value(item) or ""), entity_type)
+            if norm_val:
+                keys.add((entity_type, norm_val))
+    return keys
+
+
 def _count_entities(entities: Dict) -> int:
     total = 0
     for v in entities.values():
@@ -211,6 +348,9 @@ def _count_entities(entities: Dict) -> int:
 
 def _enforce_schema(entities: Dict) -> Dict:
     """Ensure all 8 entity types are present (with empty lists as default)."""
+    # Already conforming (the common case): a C-level key-set comparison, no rebuild
+    if entities.keys() == EXPECTED_ENTITY_KEYS:
+        return entities
     return {key: entities.get(key, []) for key in EXPECTED_ENTITY_KEYS}
 
 
@@ -238,6 +378,22 @@ def _deduplicate_all(entities: Dict) -> Dict:
     return deduped
 
 
+# ASCII-only source texts are normalized in one str.translate pass
+# (drop spaces, fold case, "o" -> "0") instead of three chained calls
+_ASCII_SOURCE_NORM_TABLE = {
+    **{c: c + 32 for c in range(ord("A"), ord("Z") + 1)},
+    ord(" "): None, ord("o"): ord("0"), ord("O"): ord("0"),
+}
+
+
+def _normalize_source_text(text: str) -> str:
+    """Spaces removed, lowercased, "o" -> "0" (for substring validation)."""
+    if text.isascii():
+        return text.translate(_ASCII_SOURCE_NORM_TABLE)
+    # Full Unicode lower(); spaces go first as final-sigma casing depends on neighbours
+    return text.replace(" ", "").lower().replace("o", "0")
+
+
 def _validate_llm_output_against_text(
     llm_entities: Dict,
     source_text: str
@@ -246,12 +402,11 @@ def _validate_llm_output_against_text(
     Anti-hallucination: every entity must be findable (or lightly normalized)
     in the source text.
     """
-    validated = {}
-    normalized_source = source_text.replace(" ", "").lower()
-    normalized_source = normalized_source.replace("o", "0")
+    normalized_source = _normalize_source_text(source_text)
 
+    # (entity_type, item, normalized value) for every item that passes the ID check
+    candidates = []
     for entity_type, items in llm_entities.items():
-        validated[entity_type] = []
         for item in items:
             value = str(item.get("value", "")) if isinstance(item, dict) else str(item)
             if not value: continue
@@ -260,46 +415,93 @@ def _validate_llm_output_against_text(
             if entity_type in ["case_ids", "policy_numbers", "order_numbers"] and len(value) < 10 and not any(c.isdigit() for c in value):
                 continue
                 
-            norm_val = value.replace(" ", "").lower()
-            if (norm_val in normalized_source or norm_val.replace("0", "o") in normalized_source):
-                validated[entity_type].append(item)
+            candidates.append((entity_type, item, value.replace(" ", "").lower()))
+
+    found = _find_in_source(candidates, normalized_source)
+
+    validated = {entity_type: [] for entity_type in llm_entities}
+    for idx, (entity_type, item, _) in enumerate(candidates):
+        if idx in found:
+            validated[entity_type].append(item)
     return validated
 
 
-def _normalize_entities(entities: Dict) -> Dict:
-    """Canonical normalization using entity_utils."""
+def _find_in_source(candidates: List[Tuple[str, Any, str]], normalized_source: str) -> Set[int]:
+    """
+    Indices of candidates whose normalized value (or its 0->o variant) occurs
+    in normalized_source. With pyahocorasick installed all values are matched
+    in a single pass over the source instead of one substring scan each.
+    """
+    if ahocorasick is None or len(candidates) < 2:
+        return {
+            idx for idx, (_, _, norm_val) in enumerate(candidates)
+            if norm_val in normalized_source or norm_val.replace("0", "o") in normalized_source
+        }
+
+    found = set()
+    automaton = ahocorasick.Automaton()
+    for idx, (_, _, norm_val) in enumerate(candidates):
+        if not norm_val:
+            found.add(idx)  # "" is trivially a substring
+            continue
+        for word in {norm_val, norm_val.replace("0", "o")}:
+            if word in automaton:
+                automaton.get(word).append(idx)
+            else:
+                automaton.add_word(word, [idx])
+    if len(automaton):
+        automaton.make_automaton()
+        for _, indices in automaton.iter(normalized_source):
+            found.update(indices)
+    return found
+
+
+def _normalize_entities(entities: Dict, threshold: float = 0.6) -> Dict:
+    """
+    Canonical normalization using entity_utils, with the confidence filter
+    folded into the same pass: entities below `threshold` are dropped (they
+    still count as known phones for disambiguation, as before).
+    """
     normalized = {}
+    norm_index = {}
+    discarded_count = 0
     for key, items in entities.items():
         normalized[key] = []
+        norm_index[key] = values = set()
         for item in items:
             if isinstance(item, dict):
                 raw_val = item.get("value", "")
                 norm_val = normalize_entity_value(raw_val, key)
                 if norm_val:
                     item["value"] = norm_val
-                    normalized[key].append(item)
+                    values.add(norm_val)
+                    if item.get("confidence", 1.0) >= threshold:
+                        normalized[key].append(item)
+                    else:
+                        discarded_count += 1
             else:
                 # Handle plain string entities (e.g., from LLM response)
                 raw_val = str(item).strip()
                 norm_val = normalize_entity_value(raw_val, key)
                 if norm_val:
                     normalized[key].append({"value": norm_val, "confidence": 0.9, "source": "llm"})
-    return disambiguate_entities(normalized)
+                    values.add(norm_val)
+    if discarded_count > 0:
+        logger.debug(f"EXTRACTION: Discarded {discarded_count} low-confidence entities")
+    return disambiguate_entities(normalized, norm_index)
 
 
 def _format_entities_for_prompt(entities: Dict) -> str:
-    """Format entities dict for LLM prompt."""
+    """Format entities dict for LLM prompt (first 5 values per type)."""
     lines = []
     for entity_type, items in entities.items():
         if items:
-            values = []
-            for item in items:
-                if isinstance(item, dict):
-                    values.append(item.get("value", str(item)))
-                else:
-                    values.append(str(item))
-            if values:
-                lines.append(f"- {entity_type}: {', '.join(values[:5])}")
+            # Only the values that make it into the prompt are formatted
+            values = [
+                item.get("value", str(item)) if isinstance(item, dict) else str(item)
+                for item in items[:5]
+            ]
+            lines.append(f"- {entity_type}: {', '.join(values)}")
     return "\n".join(lines) if lines else "None extracted"
 
 
@@ -308,7 +510,6 @@ def regex_only_extraction_agent(state: Dict[str, Any]) -> Dict[str, Any]:
     Fast, deterministic extraction using REGEX ONLY on FULL conversation history.
     Used during the engagement loop to minimize latency.
     """
-    from utils.prefilter import extract_entities_deterministic
 
     conversation_history = state.get("conversation_history", [])
 
@@ -324,10 +525,8 @@ def regex_only_extraction_agent(state: Dict[str, Any]) -> Dict[str, Any]:
     if not scammer_texts:
         return {"current_agent": "response_formatter"}
 
-    full_corpus = "\n".join(scammer_texts)
-
-    # Run deterministic extraction on full corpus
-    regex_entities = extract_entities_deterministic(full_corpus)
+    # Run deterministic extraction on full history (per-turn results are memoized)
+    regex_entities = extract_entities_from_messages(scammer_texts)
 
     # Enforce all 8 entity keys
     regex_entities = _enforce_schema(regex_entities)
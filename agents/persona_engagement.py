@@ -3,134 +3,164 @@ Persona Engagement Agent
 Drives the honeypot conversation by roleplaying as a victim to elicit scammer intelligence.
 """
 
-import json
+import re
+import itertools
 import random
 import logging
 import uuid
-from typing import Dict, Any, List
-from utils.llm_client import call_llm_async
+from typing import Dict, Any, List, Tuple
+from utils.llm_client import call_llm_async, stream_llm_async
 from config import get_settings
-from utils.parsing import parse_json_safely
+from utils.parsing import parse_json_safely, compile_prompt_template
+from utils.cache import TTLCache
+from utils.logger import AgentLogger
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
-# Persona Generation
+# Prompt templates keep all static text first and the {placeholders} last, so
+# repeated calls share the longest possible prefix for provider prompt caching.
 
-PERSONA_GENERATION_PROMPT = """Create a UNIQUE and uncommon Indian persona for a scam honeypot.
+# Persona Generation
 
-Entropy Seed: {entropy_seed}
-Context: "{message}" ({scam_type})
-Traits Instruction: {traits_instruction}
+PERSONA_GENERATION_PROMPT = """Create {count} UNIQUE and uncommon Indian personas for a scam honeypot.
 
 RULES:
 - Avoid common names (Rajesh, Rahul, Amit, Priya)
+- Every persona must have a different name, region and occupation
 - Ensure regionally realistic naming
 - Occupation must be specific and non-techy
 - Background must be 1 short sentence
 
-Return JSON ONLY:
-{{
-  "name": "Full Name",
-  "age": 18-65,
-  "occupation": "Specific job",
-  "traits": "Key personality traits",
-  "context": "1-line background",
-  "voice": "Speech style"
-}}
+Return a JSON array ONLY, one object per persona:
+[
+  {{
+    "name": "Full Name",
+    "age": 18-65,
+    "occupation": "Specific job",
+    "traits": "Key personality traits",
+    "context": "1-line background",
+    "voice": "Speech style"
+  }}
+]
+
+Entropy Seed: {entropy_seed}
+Context: "{message}" ({scam_type})
+Traits Instruction: {traits_instruction}
 """
 
+# One generation call yields a batch of personas. The unused ones are pooled
+# per (scam_type, traits) and handed out once each to later sessions, so most
+# new sessions skip the LLM call and no two sessions share a persona.
+PERSONA_BATCH_SIZE = 5
+_PERSONA_POOL = TTLCache(maxsize=256, ttl=3600)
+
+# Used when persona generation fails. Cycled in a shuffled order so an LLM
+# outage spreads sessions across every fallback instead of repeating one.
+_FALLBACK_PERSONAS = (
+    {"name": "Harbhajan Lakhotia", "age": 53, "occupation": "Municipal tax clerk",
+     "traits": "Technically confused, asks many questions", "context": "Lives in Jaipur suburb",
+     "voice": "Formal Hindi-English mix"},
+    {"name": "Lhingneilam Pamei", "age": 29, "occupation": "Nurse trainee",
+     "traits": "Anxious but cooperative, wants proof before sharing anything",
+     "context": "Renting in Guwahati", "voice": "Soft English"},
+    {"name": "Chandraketu Pradhan", "age": 61, "occupation": "Retired railway supervisor",
+     "traits": "Slow, trusting but needs official confirmation",
+     "context": "Pension dependent", "voice": "Polite formal"},
+    {"name": "Samarjit Boro", "age": 34, "occupation": "Freelance electrician",
+     "traits": "Practical, skeptical of phone calls, asks for documentation",
+     "context": "Contract worker, minimal savings", "voice": "Direct and blunt"},
+)
+_FALLBACK_ROTATION = itertools.cycle(random.sample(_FALLBACK_PERSONAS, len(_FALLBACK_PERSONAS)))
+
 
 # Engagement Strategy
 
 ENGAGEMENT_PROMPT = """You are a REAL HUMAN (NOT an AI). Never reveal you are an AI or Honeypot.
 
-YOUR IDENTITY:
-Name: {name} | Job: {occupation} | Traits: {traits} | Voice: {voice}
+MANDATORY RULES (violating any = failure):
 
-SCAM TYPE: {scam_type}
+1. ALWAYS end your response with a "?".
+   FAIL: "Okay, I understand."
+   PASS: "Why do you need my OTP for any of this?"
 
-FULL CONVERSATION (oldest → newest):
-{chat_context}
+2. EVERY response MUST include ONE investigative probe containing one of these EXACT phrases, spaces included (vary across turns):
+   "official website", "reference number", "case id", "supervisor", "manager", "branch name", "why so urgent", "employee id", "explain the process"
+   PASS: "Can you give me your employee id so I can verify independently?"
 
-PLANNER STRATEGY:
-{strategy_hint}
+3. EVERY response MUST contain one of these EXACT suspicion phrases (most natural one, vary across turns):
+   "suspicious", "looks like a red flag", "unusual", "uncommon", "legitimate bank would not", "official channels", "verify independently", "OTP is suspicious", "unofficial link"
+   PASS: "This whole thing looks like a red flag to me, no?"
 
-════════════════════════════════════════════
-MANDATORY RULES — VIOLATING ANY = FAILURE
-════════════════════════════════════════════
+4. Naturally ask for at least one specific piece of data per turn: phone number, email, case/reference ID, policy number, order number, UPI ID, bank account, URL, branch name, supervisor contact.
 
-1. ALWAYS end your response with a "?" question mark.
-   FAIL: "Okay, I understand." ← NEVER end like this
-   PASS: "Why do you need my OTP for any of this?"
+5. Keep responses SHORT: 2-3 sentences + question. Vary: confused, worried, skeptical, slow.
 
-2. ⚠️  EVERY response MUST include ONE investigative probe that NATURALLY contains
-   one of these EXACT phrases EXACTLY AS WRITTEN including spaces (vary across turns):
-   → "official website"
-   → "reference number"
-   → "case id"
-   → "supervisor"
-   → "manager"
-   → "branch name"
-   → "why so urgent"
-   → "employee id"
-   → "explain the process"
-   FAIL: Any response missing ALL of these phrases EXACTLY ← AUTOMATIC FAILURE
-   PASS: "Can you give me your employee id so I can verify independently?"
+6. NEVER use robotic filler like "Noted.", "I understand.", "Okay.".
 
-3. ⚠️  EVERY response MUST contain one of these EXACT suspicion phrases
-   (choose the most situationally natural one — vary across turns):
-   → "suspicious" / "looks like a red flag"
-   → "unusual" / "uncommon"
-   → "legitimate bank would not"
-   → "official channels"
-   → "verify independently"
-   → "OTP is suspicious"
-   → "unofficial link"
-   FAIL: Any response missing ALL of these phrases ← AUTOMATIC FAILURE
-   PASS: "This whole thing looks like a red flag to me, no?"
+SELF-CHECK before writing: suspicion phrase (rule 3)? investigative phrase (rule 2)? ends with "?"? 2-3 sentences max? If any check fails, rewrite.
 
-4. ELICITATION — Naturally ask for at least one specific piece of data per turn:
-   Phone number, Email, Case/Reference ID, Policy number, Order number, UPI ID, Bank account, URL, Branch name, Supervisor contact.
+YOUR IDENTITY:
+Name: {name} | Job: {occupation} | Traits: {traits} | Voice: {voice}
 
-5. Keep responses SHORT — 2-3 sentences + question. Vary: confused, worried, skeptical, slow.
+SCAM TYPE: {scam_type}
 
-6. NEVER say "Noted.", "I understand.", "Okay." or any robotic filler.
+FULL CONVERSATION (oldest → newest):
+{chat_context}
 
-════════════════════════════════════════════
-SELF-CHECK BEFORE WRITING (mandatory):
-  ✓ Contains a suspicion phrase from rule 3?
-  ✓ Contains an investigative phrase from rule 2?
-  ✓ Ends with "?"?
-  ✓ 2-3 sentences max?
-If any check fails → rewrite until all pass.
-════════════════════════════════════════════
+PLANNER STRATEGY:
+{strategy_hint}
 
 Now write the NEXT message from {name}. It MUST pass all 4 self-checks above.
 """
+# Rendered every turn: split into literal chunks once at import
+_render_engagement_prompt = compile_prompt_template(ENGAGEMENT_PROMPT)
+
+# Conversation context budget for the reply prompt (~800 tokens at ~4 chars/token)
+RESPONSE_HISTORY_CHARS = 3200
+
+# Replies are "2-3 sentences + question"; generation past this many sentences
+# is cut off and the stream closed instead of waiting for the full decode
+MAX_RESPONSE_SENTENCES = 4
+# Terminal punctuation, the word before it and the first character after the gap
+_SENTENCE_END_RE = re.compile(r"([\w/]*)([.?!]+)(?=\s+(\S))")
+# Periods after these are not sentence ends ("Rs. 500", "Mr. Sharma", "A/c no. 1234")
+_ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "sr", "jr", "st", "rs", "no", "a/c", "ac", "acc",
+    "ref", "inr", "ltd", "pvt", "govt", "dept", "vs", "etc", "approx",
+})
 
 
 # =========================================================
 # MAIN AGENT
 # =========================================================
 
+async def generate_persona_fields(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generate a new persona and return it as the persona_name / persona_context
+    state fields. Lets the workflow start generation before this agent runs.
+    """
+    persona = await _generate_unique_persona(state)
+
+    AgentLogger.persona_update(
+        persona["name"],
+        persona["occupation"],
+        "Persona Generated"
+    )
+    return {"persona_name": persona["name"], "persona_context": persona}
+
+
 async def persona_engagement_agent(state: Dict[str, Any]) -> Dict[str, Any]:
 
     if not state.get("persona_name"):
-        persona = await _generate_unique_persona(state)
-        state["persona_name"] = persona["name"]
-        state["persona_context"] = json.dumps(persona)
-
-        from utils.logger import AgentLogger
-        AgentLogger.persona_update(
-            persona["name"],
-            persona["occupation"],
-            "Persona Generated"
-        )
+        state.update(await generate_persona_fields(state))
 
-    persona_context = state.get("persona_context", "{}")
-    persona = json.loads(persona_context)
+    persona_context = state.get("persona_context") or {}
+    if isinstance(persona_context, str):
+        # Sessions saved before personas were kept as dicts
+        persona_context = parse_json_safely(persona_context)
+    persona = persona_context
 
     conversation_history = state.get("conversation_history", [])
     engagement_count = state.get("engagement_count", 0)
@@ -148,7 +178,6 @@ async def persona_engagement_agent(state: Dict[str, Any]) -> Dict[str, Any]:
         # ── Enforce question mark ─────────────────────────────────────────────
         honeypot_message = _ensure_ends_with_question(honeypot_message, engagement_count)
 
-        from utils.logger import AgentLogger
         AgentLogger.response_generated(honeypot_message)
 
         new_history = list(conversation_history)
@@ -166,7 +195,7 @@ async def persona_engagement_agent(state: Dict[str, Any]) -> Dict[str, Any]:
 
         return {
             "persona_name": persona.get("name"),
-            "persona_context": json.dumps(persona),
+            "persona_context": persona,
             "conversation_history": new_history,
             "engagement_count": engagement_count + 1,
             "questions_asked": questions_asked,
@@ -189,7 +218,7 @@ async def persona_engagement_agent(state: Dict[str, Any]) -> Dict[str, Any]:
 # =========================================================
 
 # Fallback elicitation questions by turn (ensures we never miss a "?")
-FALLBACK_QUESTIONS = [
+FALLBACK_QUESTIONS = (
     "What is your employee id?",
     "Which branch name are you calling from?",
     "Can you provide your supervisor contact?",
@@ -198,7 +227,7 @@ FALLBACK_QUESTIONS = [
     "What is the official website?",
     "Can you give me the reference number?",
     "What is the case id?",
-]
+)
 
 
 def _ensure_ends_with_question(message: str, turn: int) -> str:
@@ -211,16 +240,43 @@ def _ensure_ends_with_question(message: str, turn: int) -> str:
     fallback = FALLBACK_QUESTIONS[turn % len(FALLBACK_QUESTIONS)]
     
     # Clean up trailing punctuation before appending the fallback question
-    if message.endswith("?") or message.endswith("."):
-        return message + " " + fallback
-        
-    return message + "? " + fallback
+    if message.endswith(("?", ".")):
+        return f"{message} {fallback}"
+
+    return f"{message}? {fallback}"
 
 
 # =========================================================
 # PERSONA GENERATION
 # =========================================================
 
+def _safe_persona_traits(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Caller-supplied persona traits, minus the identity fields the LLM picks."""
+    traits = state.get("persona_traits", {}) or {}
+    return {
+        k: v for k, v in traits.items()
+        if k not in ["name", "age", "occupation", "context", "voice"]
+    }
+
+
+def _persona_pool_key(scam_type: Any, safe_traits: Dict[str, Any]) -> Tuple:
+    return (scam_type, tuple(sorted((k, str(v)) for k, v in safe_traits.items())))
+
+
+def release_persona_fields(state: Dict[str, Any], fields: Dict[str, Any]):
+    """
+    Return a persona from generate_persona_fields that ended up unused to the
+    pool, so the next matching session gets it instead of a new LLM call.
+    """
+    persona = fields.get("persona_context")
+    if not isinstance(persona, dict) or persona in _FALLBACK_PERSONAS:
+        return
+    pool_key = _persona_pool_key(state.get("scam_type", "Unknown"), _safe_persona_traits(state))
+    pooled = _PERSONA_POOL.get(pool_key) or []
+    pooled.append(persona)
+    _PERSONA_POOL.set(pool_key, pooled)
+
+
 async def _generate_unique_persona(state: Dict[str, Any]) -> Dict:
 
     message = state.get("original_message", "")
@@ -228,18 +284,17 @@ async def _generate_unique_persona(state: Dict[str, Any]) -> Dict:
     conversation_id = state.get("conversation_id", str(uuid.uuid4()))
     entropy_seed = conversation_id[-8:]
 
-    traits = state.get("persona_traits", {})
-    if traits:
-        safe_traits = {
-            k: v for k, v in traits.items()
-            if k not in ["name", "age", "occupation", "context", "voice"]
-        }
-        traits_instruction = ", ".join([f"{k}: {v}" for k, v in safe_traits.items()]) \
-            if safe_traits else "Choose traits matching scam context."
-    else:
-        traits_instruction = "Choose traits matching scam context."
+    safe_traits = _safe_persona_traits(state)
+    traits_instruction = ", ".join([f"{k}: {v}" for k, v in safe_traits.items()]) \
+        if safe_traits else "Choose traits matching scam context."
+
+    pool_key = _persona_pool_key(scam_type, safe_traits)
+    pooled = _PERSONA_POOL.get(pool_key)
+    if pooled:
+        return pooled.pop()
 
     prompt = PERSONA_GENERATION_PROMPT.format(
+        count=PERSONA_BATCH_SIZE,
         message=message,
         scam_type=scam_type,
         traits_instruction=traits_instruction,
@@ -249,37 +304,32 @@ async def _generate_unique_persona(state: Dict[str, Any]) -> Dict:
     try:
         response_text = await call_llm_async(
             prompt=prompt,
-            system_instruction="Generate fictional Indian character profile. Return JSON only.",
+            system_instruction=(
+                f"Generate {PERSONA_BATCH_SIZE} distinct fictional Indian character profiles. "
+                "Return a JSON array only."
+            ),
             json_mode=True,
             agent_name="persona",
             temperature=0.9
         )
 
-        persona = parse_json_safely(response_text)
-        if isinstance(persona, list) and persona:
-            persona = persona[0]
-        if not isinstance(persona, dict):
+        personas = parse_json_safely(response_text)
+        if isinstance(personas, dict):
+            personas = [personas]
+        if not isinstance(personas, list):
+            personas = []
+        personas = [p for p in personas if isinstance(p, dict) and p.get("name") and p.get("occupation")]
+        if not personas:
             raise ValueError("Invalid persona format")
+
+        persona = personas.pop(0)
+        if personas:
+            _PERSONA_POOL.set(pool_key, personas)
         return persona
 
     except Exception as e:
         logger.error(f"Persona generation error: {e}")
-        fallbacks = [
-            {"name": "Harbhajan Lakhotia", "age": 53, "occupation": "Municipal tax clerk",
-             "traits": "Technically confused, asks many questions", "context": "Lives in Jaipur suburb",
-             "voice": "Formal Hindi-English mix"},
-            {"name": "Lhingneilam Pamei", "age": 29, "occupation": "Nurse trainee",
-             "traits": "Anxious but cooperative, wants proof before sharing anything",
-             "context": "Renting in Guwahati", "voice": "Soft English"},
-            {"name": "Chandraketu Pradhan", "age": 61, "occupation": "Retired railway supervisor",
-             "traits": "Slow, trusting but needs official confirmation",
-             "context": "Pension dependent", "voice": "Polite formal"},
-            {"name": "Samarjit Boro", "age": 34, "occupation": "Freelance electrician",
-             "traits": "Practical, skeptical of phone calls, asks for documentation",
-             "context": "Contract worker, minimal savings", "voice": "Direct and blunt"}
-        ]
-        index = int(uuid.UUID(conversation_id)) % len(fallbacks)
-        return fallbacks[index]
+        return dict(next(_FALLBACK_ROTATION))
 
 
 # =========================================================
@@ -288,18 +338,23 @@ async def _generate_unique_persona(state: Dict[str, Any]) -> Dict:
 
 async def _generate_response(state: Dict[str, Any], persona: Dict, history: List) -> str:
 
-    full_history = history[-20:]
-
+    # Newest turns first until the context budget is spent (the latest is always kept)
     context_lines = []
-    for turn in full_history:
+    budget = RESPONSE_HISTORY_CHARS
+    for turn in reversed(history[-20:]):
         role_label = "SCAMMER" if turn["role"] == "scammer" else "YOU"
-        sanitized_msg = turn['message'].replace('{', '').replace('}', '')[:500]
-        context_lines.append(f"{role_label}: {sanitized_msg}")
+        sanitized_msg = turn['message'][:500].replace('{', '').replace('}', '')
+        line = f"{role_label}: {sanitized_msg}"
+        if context_lines and len(line) > budget:
+            break
+        context_lines.append(line)
+        budget -= len(line) + 1
+    context_lines.reverse()
 
     chat_context = "\n".join(context_lines) if context_lines else "No previous conversation."
     strategy_hint = state.get("strategy_hint", "STALL: Be confused and ask for more details. End with a question.")
 
-    prompt = ENGAGEMENT_PROMPT.format(
+    prompt = _render_engagement_prompt(
         name=persona.get("name", "Unknown"),
         occupation=persona.get("occupation", "Unknown"),
         traits=persona.get("traits", "Normal"),
@@ -309,7 +364,7 @@ async def _generate_response(state: Dict[str, Any], persona: Dict, history: List
         strategy_hint=strategy_hint
     )
 
-    return await call_llm_async(
+    stream = stream_llm_async(
         prompt=prompt,
         system_instruction=(
             "You are a real human victim responding to a possible scammer. "
@@ -322,3 +377,32 @@ async def _generate_response(state: Dict[str, Any], persona: Dict, history: List
         agent_name="response",
         temperature=0.65
     )
+
+    text = ""
+    try:
+        async for chunk in stream:
+            text += chunk  # Tens of tokens: a few short chunks
+            ends = _sentence_ends(text)
+            if len(ends) >= MAX_RESPONSE_SENTENCES:
+                text = text[:ends[MAX_RESPONSE_SENTENCES - 1]]
+                break
+    finally:
+        await stream.aclose()
+    return text
+
+
+def _sentence_ends(text: str) -> List[int]:
+    """
+    End offsets of the sentences in text that are followed by more text. A run
+    of periods only counts when the next word is capitalized and the word
+    before it is not a common abbreviation.
+    """
+    ends = []
+    for match in _SENTENCE_END_RE.finditer(text):
+        word, punct, next_char = match.groups()
+        if "?" not in punct and "!" not in punct and (
+            word.lower() in _ABBREVIATIONS or not next_char.isupper()
+        ):
+            continue
+        ends.append(match.end())
+    return ends
@@ -8,10 +8,12 @@ Key changes:
 """
 
 import re
-import json
+import orjson
 import logging
 from typing import Dict, Any, Tuple
 from utils.llm_client import call_llm_async
+from utils.parsing import compile_prompt_template
+from utils.logger import AgentLogger
 
 logger = logging.getLogger(__name__)
 
@@ -99,9 +101,11 @@ Respond with JSON ONLY:
     "reasoning": "..." | null
 }}"""
 
+# Rendered every turn: split into literal chunks once at import
+_render_planner_prompt = compile_prompt_template(PLANNER_PROMPT)
+
 
 async def planner_agent(state: Dict[str, Any]) -> Dict[str, Any]:
-    from utils.logger import AgentLogger
     logger = logging.getLogger(__name__)
 
     AgentLogger.thought_process("PLANNER", "Analyzing conversation state and strategy...")
@@ -178,9 +182,10 @@ async def planner_agent(state: Dict[str, Any]) -> Dict[str, Any]:
             prompt=prompt,
             system_instruction="You are a strategic planner for a scam honeypot. Follow the SCORING REQUIREMENTS exactly.",
             json_mode=True,
-            agent_name="planner"
+            agent_name="planner",
+            cache=True
         )
-        plan = json.loads(response_text)
+        plan = orjson.loads(response_text)
     except Exception as e:
         logger.error(f"Planner LLM failed: {e}")
         return _safe_fallback(turns_used)
@@ -300,6 +305,8 @@ def _determine_verdict(
 # SMART EXIT — MINIMUM 8 TURNS
 # =============================================================================
 
+MIN_ENGAGEMENT_TURNS = 8
+
 def _check_smart_exit(
     high_value: int, total: int, turns: int, max_turns: int, distinct_types: int
 ) -> Tuple[bool, str]:
@@ -313,7 +320,7 @@ def _check_smart_exit(
         return False, "Turn 0: Must engage."
 
     # MANDATORY MINIMUM: 8 turns
-    if turns < 8:
+    if turns < MIN_ENGAGEMENT_TURNS:
         return False, f"Turn {turns}: Minimum 8 turns required. Keep engaging."
 
     # After turn 8: exit if we have decent yield
@@ -341,10 +348,10 @@ def _build_prompt(
     policy_list: list, phone_list: list
 ) -> str:
     history = state.get("conversation_history", [])
-    recent_history = ""
-    for turn in history[-4:]:
-        role = "Honeypot" if turn["role"] == "honeypot" else "Scammer"
-        recent_history += f"{role}: {turn['message']}\n"
+    recent_history = "".join(
+        f"{'Honeypot' if turn['role'] == 'honeypot' else 'Scammer'}: {turn['message']}\n"
+        for turn in history[-4:]
+    )
 
     last_message = state.get("original_message", "")
     if history and history[-1]["role"] == "scammer":
@@ -368,7 +375,7 @@ def _build_prompt(
     else:
         pacing_info = "No historical data. Use default strategy."
 
-    return PLANNER_PROMPT.format(
+    return _render_planner_prompt(
         scam_detected=state.get("scam_detected", False),
         scam_type=state.get("scam_type", "Unknown"),
         turns_used=turns_used,
@@ -15,6 +15,18 @@ from config import get_settings
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Entity types in the response, in output order
+RESPONSE_ENTITY_KEYS = (
+    "bank_accounts",
+    "upi_ids",
+    "phishing_urls",
+    "phone_numbers",
+    "email_addresses",
+    "case_ids",
+    "policy_numbers",
+    "order_numbers",
+)
+
 
 # =========================================================
 # SUMMARY PROMPT (STRUCTURED + TOKEN EFFICIENT)
@@ -52,28 +64,24 @@ async def response_formatter_agent(state: Dict[str, Any]) -> Dict[str, Any]:
     confidence = float(state.get("confidence_score", 0.0))
 
     entities = state.get("extracted_entities", {}) or {}
+    # Flattened once: used for the response and the summary prompt
+    flat_entities = {
+        # All 8 entity types for scoring rubric
+        key: _flatten_entities(entities.get(key, []))
+        for key in RESPONSE_ENTITY_KEYS
+    }
 
     try:
-        summary = await _generate_summary(state, entities)
+        summary = await _generate_summary(state, flat_entities)
     except Exception as e:
         logger.error(f"Summary generation failed: {e}")
-        summary = _fallback_summary(state, entities)
+        summary = _fallback_summary(state, flat_entities)
 
     final_response = {
         "scam_detected": is_scam,
         "scam_type": scam_type,
         "confidence_score": confidence,
-        "extracted_entities": {
-            # All 8 entity types for scoring rubric
-            "bank_accounts": _flatten_entities(entities.get("bank_accounts", [])),
-            "upi_ids": _flatten_entities(entities.get("upi_ids", [])),
-            "phishing_urls": _flatten_entities(entities.get("phishing_urls", [])),
-            "phone_numbers": _flatten_entities(entities.get("phone_numbers", [])),
-            "email_addresses": _flatten_entities(entities.get("email_addresses", [])),
-            "case_ids": _flatten_entities(entities.get("case_ids", [])),
-            "policy_numbers": _flatten_entities(entities.get("policy_numbers", [])),
-            "order_numbers": _flatten_entities(entities.get("order_numbers", [])),
-        },
+        "extracted_entities": flat_entities,
         "behavioral_signals": state.get("behavioral_signals", []),
         "confidence_factors": state.get("confidence_factors", {}),
         "conversation_summary": summary,
@@ -122,9 +130,9 @@ async def _generate_summary(state: Dict[str, Any], entities: Dict) -> str:
 
     conv_text = "\n".join(conv_lines)
 
-    bank_accounts = _flatten_entities(entities.get("bank_accounts", []))
-    upi_ids = _flatten_entities(entities.get("upi_ids", []))
-    phishing_urls = _flatten_entities(entities.get("phishing_urls", []))
+    bank_accounts = entities.get("bank_accounts", [])
+    upi_ids = entities.get("upi_ids", [])
+    phishing_urls = entities.get("phishing_urls", [])
 
     prompt = SUMMARY_PROMPT.format(
         scam_type=scam_type,
@@ -182,10 +190,7 @@ def _fallback_summary(state: Dict[str, Any], entities: Dict) -> str:
 # =========================================================
 
 def _flatten_entities(entity_list):
-    flattened = []
-    for e in entity_list:
-        if isinstance(e, dict):
-            flattened.append(str(e.get("value", "")))
-        else:
-            flattened.append(str(e))
-    return flattened
+    return [
+        str(e.get("value", "")) if isinstance(e, dict) else str(e)
+        for e in entity_list
+    ]
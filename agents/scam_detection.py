@@ -7,6 +7,8 @@ import logging
 from typing import Dict, Any
 from config import get_settings
 from utils.parsing import parse_json_safely
+from utils.llm_client import call_llm_async
+from utils.logger import AgentLogger
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -97,9 +99,6 @@ async def scam_detection_agent(state: Dict[str, Any]) -> Dict[str, Any]:
     Async + production hardened.
     """
 
-    from utils.llm_client import call_llm_async
-    from utils.logger import AgentLogger
-
     # -------------------------
     # Extract Inputs
     # -------------------------
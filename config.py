@@ -63,6 +63,7 @@ class Settings(BaseSettings):
 
     # Serper API for Internet Verification
     serper_api_key: str = os.getenv("SERPER_API_KEY", "")
+    serper_max_concurrency: int = int(os.getenv("SERPER_MAX_CONCURRENCY", "16"))
     
     # API Security
     api_secret_key: str = os.getenv("API_SECRET_KEY", "langfasthoneypot1234")
@@ -102,6 +103,19 @@ def get_settings() -> Settings:
     return Settings()
 
 
+# Settings field holding each agent's model (unknown agents use planner_model)
+_AGENT_MODEL_FIELDS = {
+    "planner": "planner_model",
+    "detection": "detection_model",
+    "persona": "persona_model",
+    "response": "response_model",
+    "extraction": "extraction_model",
+    "judge": "judge_model",
+    "factcheck": "factcheck_model",
+    "summary": "response_model",  # Use response model for summaries
+}
+
+
 def get_model_for_agent(agent_name: str) -> str:
     """
     Get the appropriate model for a specific agent.
@@ -113,16 +127,5 @@ def get_model_for_agent(agent_name: str) -> str:
     Returns:
         Model name to use for this agent
     """
-    settings = get_settings()
-    model_map = {
-        "planner": settings.planner_model,
-        "detection": settings.detection_model,
-        "persona": settings.persona_model,
-        "response": settings.response_model,
-        "extraction": settings.extraction_model,
-        "judge": settings.judge_model,
-        "factcheck": settings.factcheck_model,
-        "summary": settings.response_model,  # Use response model for summaries
-    }
     # Default to planner model if not found
-    return model_map.get(agent_name, settings.planner_model)
+    return getattr(get_settings(), _AGENT_MODEL_FIELDS.get(agent_name, "planner_model"))
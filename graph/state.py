@@ -32,7 +32,7 @@ class HoneypotState(TypedDict):
     # Engagement State
     persona_name: str
     persona_traits: Dict[str, Any]
-    persona_context: str
+    persona_context: Dict[str, Any]
     conversation_history: List[ConversationTurn]
     engagement_count: int
     max_engagements: int
@@ -137,7 +137,7 @@ def create_initial_state(
         # Engagement
         persona_name=memory.get("persona_name", ""),
         persona_traits=memory.get("persona_traits", {}),
-        persona_context=memory.get("persona_context", ""),
+        persona_context=memory.get("persona_context") or {},
         conversation_history=[],
         engagement_count=memory.get("engagement_count", 0),
         max_engagements=max_engagements,
@@ -21,8 +21,8 @@ from langgraph.graph import StateGraph, END
 
 from graph.state import HoneypotState, create_initial_state
 from agents.scam_detection import scam_detection_agent
-from agents.planner import planner_agent
-from agents.persona_engagement import persona_engagement_agent
+from agents.planner import planner_agent, MIN_ENGAGEMENT_TURNS
+from agents.persona_engagement import persona_engagement_agent, generate_persona_fields, release_persona_fields
 from agents.intelligence_extraction import intelligence_extraction_agent
 from agents.response_formatter import response_formatter_agent
 from memory.postgres_memory import capture_session_lock
@@ -107,7 +107,36 @@ async def _scam_detection_node(state: HoneypotState) -> Dict[str, Any]:
     return await scam_detection_agent(dict(state))
 
 async def _planner_node(state: HoneypotState) -> Dict[str, Any]:
-    return await planner_agent(dict(state))
+    """
+    Run the planner. On a session's first engagement (no persona yet) persona
+    generation does not depend on the plan, so both LLM calls run concurrently
+    and the persona is handed to persona_engagement through state. This only
+    happens while the planner must engage (below the minimum turn count); a
+    persona the plan doesn't use goes back to the pool.
+    """
+    turns_used = state.get("engagement_count", 0)
+    if (
+        state.get("persona_name")
+        or turns_used >= MIN_ENGAGEMENT_TURNS
+        or turns_used >= (state.get("max_engagements") or MIN_ENGAGEMENT_TURNS)
+    ):
+        return await planner_agent(dict(state))
+
+    plan_res, persona_res = await asyncio.gather(
+        planner_agent(dict(state)),
+        generate_persona_fields(dict(state)),
+        return_exceptions=True
+    )
+    if isinstance(plan_res, BaseException):
+        raise plan_res
+    if isinstance(persona_res, BaseException):
+        # persona_engagement will generate it itself
+        logger.warning(f"Speculative persona generation failed: {persona_res}")
+    elif plan_res.get("planner_action") == "engage":
+        return {**plan_res, **persona_res}
+    else:
+        release_persona_fields(dict(state), persona_res)
+    return plan_res
 
 async def _persona_engagement_node(state: HoneypotState) -> Dict[str, Any]:
     return await persona_engagement_agent(dict(state))
@@ -352,13 +381,13 @@ async def run_honeypot_workflow(
         # Load persona from memory if exists (fixes persona changing every turn)
         if memory_context.get("persona_name"):
             initial_state["persona_name"] = memory_context["persona_name"]
-            initial_state["persona_context"] = memory_context.get("persona_context", "{}")
+            initial_state["persona_context"] = memory_context.get("persona_context") or {}
             # logger.info(f"Loaded existing persona: {memory_context['persona_name']}")
             AgentLogger._print_colored("MEMORY", "cyan", "🧠", "Loaded Persona", memory_context['persona_name'])
         
         if initial_history:
             initial_state["conversation_history"] = initial_history
-            initial_state["engagement_count"] = len([m for m in initial_history if m["role"] == "honeypot"])
+            initial_state["engagement_count"] = sum(1 for m in initial_history if m["role"] == "honeypot")
             initial_state["scam_detected"] = memory_context.get("scam_detected", False)
 
         # 3. Execute Workflow
@@ -40,8 +40,17 @@ async def lifespan(app: FastAPI):
         logger.info("Pre-warming database connection pool...")
         await init_db_pool()
     
+    # Build the shared LLM client now so the first request doesn't pay for it
+    if settings.gemini_api_key:
+        from utils.llm_client import get_llm_client
+        get_llm_client()
+    
     yield
     logger.info("Agentic Honey-Pot API shutting down...")
+    from agents.fact_checker import close_serper_client
+    await close_serper_client()
+    from utils.guvi_callback import close_callback_client
+    await close_callback_client()
 
 
 app = FastAPI(
@@ -4,6 +4,7 @@ Provides persistent conversational memory and intelligence context using pgvecto
 """
 
 import json
+import orjson
 import logging
 import uuid
 import asyncio
@@ -104,16 +105,18 @@ async def _load_memory_impl(conn: asyncpg.Connection, conversation_id: str) -> D
         if row and row['metadata']:
             meta = row['metadata']
             if isinstance(meta, str):
-                meta = json.loads(meta)
+                meta = orjson.loads(meta)
             
             memory_context["conversation_summary"] = meta.get("summary", "")
             memory_context["persona_name"] = meta.get("persona_name")
-            # Ensure persona_context is a string for json.loads in agent
+            # persona_context is a dict in state; older sessions stored a JSON string
             p_ctx = meta.get("persona_context")
-            if isinstance(p_ctx, dict):
-                memory_context["persona_context"] = json.dumps(p_ctx)
-            else:
-                memory_context["persona_context"] = p_ctx or "{}"
+            if isinstance(p_ctx, str):
+                try:
+                    p_ctx = orjson.loads(p_ctx)
+                except orjson.JSONDecodeError:
+                    p_ctx = None
+            memory_context["persona_context"] = p_ctx if isinstance(p_ctx, dict) else {}
                 
             memory_context["persona_traits"] = meta.get("persona_traits", {})
             memory_context["engagement_count"] = meta.get("engagement_count", 0)
@@ -224,7 +227,7 @@ async def _persist_memory_impl(conn: asyncpg.Connection, conversation_id: str, s
             """,
             conversation_id,
             state.get("scam_type"),
-            json.dumps(metadata)
+            orjson.dumps(metadata).decode()
         )
 
         # 2. Insert Messages (Optimized with Batch Embeddings)
@@ -0,0 +1,11 @@
+from agents.entity_utils import merge_entities, normalize_entity_value
+
+
+def test_non_ascii_digits_are_mapped_to_ascii():
+    assert normalize_entity_value("१२३४५६७८९०१२", "bank_accounts") == "123456789012"
+
+
+def test_merge_keeps_devanagari_bank_account():
+    new = {"bank_accounts": [{"value": "१२३४५६७८९०१२", "confidence": 1.0, "source": "regex"}]}
+    merged = merge_entities({}, new)
+    assert [item["value"] for item in merged["bank_accounts"]] == ["123456789012"]
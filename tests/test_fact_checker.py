@@ -0,0 +1,65 @@
+import re
+
+import pytest
+
+import agents.fact_checker as fc
+from agents.fact_checker import extract_claims_from_message
+
+
+@pytest.mark.parametrize("message", [
+    "SBI\xa0bonus\xa0offer expires today",
+    "You have won Rs\xa05,00,000 in the draw",
+    "Register for PM Kisān Yojana now",
+])
+def test_claims_with_unicode_spacing_and_letters_are_extracted(message):
+    assert extract_claims_from_message(message)
+
+
+TRIGGER_MESSAGES = [
+    "Apply for PM Kisan before Friday",
+    "PM KİSAN yojana ka paisa aaya hai",
+    "pm\xa0awas registration is open",
+    "Pradhan Mantri Awas Yojana list is out",
+    "RBI circular: all accounts must re-verify",
+    "Income Tax refund of Rs 15,000 pending",
+    "ITR verification pending, click here",
+    "SBI security alert for your card",
+    "KYC update mandatory today",
+    "Your account\xa0blocked due to suspicious activity",
+    "Get 12.5% monthly return, guaranteed",
+    "Double your money within 30 days",
+    "You won Rs 5 lakh in the lucky draw",
+    "₹\xa025,00,000 crore winner announced",
+    "₹ ५०,००० lakh reward",
+    "Amazon hiring for work from home job",
+    "Pay the registration fee of Rs 499",
+    "LIC policy maturity bonus released",
+    "Electricity bill payment due, disconnect tonight",
+    "ſcheme and Kelvin: PM ſcheme",
+    "Hello, how are you doing today?",
+    "Please call me back later",
+    "KYC\x1cupdate via unit separator",
+    "KYC\x0bupdate\tvia\x0ctabs",
+    "",
+]
+
+
+@pytest.mark.parametrize("message", TRIGGER_MESSAGES)
+def test_should_fact_check_matches_trigger_regex(message):
+    """The anchor screen (and Hyperscan, when installed) never changes the verdict."""
+    assert fc.should_fact_check(message) == (fc.FACT_CHECK_RE.search(message) is not None)
+
+
+@pytest.mark.parametrize("message", TRIGGER_MESSAGES)
+def test_hyperscan_trigger_db_matches_re_per_pattern(message):
+    pytest.importorskip("hyperscan")
+    assert fc._TRIGGER_DB is not None
+    if not message.isascii():
+        pytest.skip("should_fact_check only uses Hyperscan for ASCII messages")
+    hits = set()
+    fc._TRIGGER_DB.scan(
+        message.translate(fc._HS_SEPARATOR_TABLE).encode("utf-8"),
+        match_event_handler=lambda pattern_id, start, end, flags, ctx: hits.add(pattern_id),
+    )
+    expected = {i for i, pattern in enumerate(fc.FACT_CHECK_TRIGGERS) if re.search(pattern, message)}
+    assert hits == expected
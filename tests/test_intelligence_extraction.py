@@ -0,0 +1,95 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+import agents.intelligence_extraction as ie
+
+
+PRIOR_UPI = {"upi_ids": [{"value": "fraud@okaxis", "confidence": 1.0, "source": "regex"}]}
+
+
+def _state(latest_message):
+    return {
+        "conversation_id": "test-conversation",
+        "original_message": latest_message,
+        "conversation_history": [
+            {"role": "scammer", "message": "Pay the fine to fraud@okaxis now", "turn_number": 1},
+            {"role": "honeypot", "message": "Why so urgent?", "turn_number": 2},
+            {"role": "scammer", "message": latest_message, "turn_number": 3},
+        ],
+        "extracted_entities": PRIOR_UPI,
+    }
+
+
+def _run(monkeypatch, latest_message):
+    calls = []
+
+    async def fake_verifier(conversation_id, prompt):
+        calls.append(prompt)
+        return json.dumps({"verified_entities": {}})
+
+    monkeypatch.setattr(ie, "_call_verifier", fake_verifier)
+    ie._VERIFY_CACHE.clear()
+    asyncio.run(ie.intelligence_extraction_agent(_state(latest_message)))
+    return calls
+
+
+def test_spelled_out_number_reaches_verifier_after_prior_entity(monkeypatch):
+    calls = _run(monkeypatch, "Call my senior on nine eight seven six five four three two one zero")
+    assert len(calls) == 1
+
+
+def test_turn_without_entity_hints_skips_verifier(monkeypatch):
+    calls = _run(monkeypatch, "Please hurry up sir, your account will be blocked")
+    assert calls == []
+
+
+def test_relevant_context_sends_text_within_budget_whole():
+    text = ("Sir please listen carefully, this is very important for you. " * 25
+            + "Send it to rahul dot sharma at okaxis")
+    assert len(text) <= ie.VERIFY_CONTEXT_CHARS
+    assert ie._relevant_context(text) == text
+
+
+def test_relevant_context_keeps_obfuscated_entities_when_trimming():
+    filler = "Sir please listen carefully, this is very important for you. " * 40
+    text = filler + "Pay to rahul dot sharma at okaxis today. " + filler
+    trimmed = ie._relevant_context(text)
+    assert "okaxis" in trimmed
+    assert len(trimmed) <= ie.VERIFY_CONTEXT_CHARS
+
+
+def test_newer_verification_supersedes_older_one(monkeypatch):
+    async def fake_llm(prompt, **kwargs):
+        if prompt == "old":
+            await asyncio.sleep(10)  # Still running when the newer turn arrives
+        return prompt
+
+    monkeypatch.setattr(ie, "call_llm_async", fake_llm)
+
+    async def scenario():
+        older = asyncio.create_task(ie._call_verifier("test-conversation", "old"))
+        await asyncio.sleep(0)  # Let the older call start
+        newer = await ie._call_verifier("test-conversation", "new")
+        return await older, newer
+
+    assert asyncio.run(scenario()) == (None, "new")
+    assert "test-conversation" not in ie._inflight_verifications
+
+
+def test_aho_corasick_matching_equals_substring_scans(monkeypatch):
+    pytest.importorskip("ahocorasick")
+    rng = random.Random(1234)
+    alphabet = "0o1l@.ab9-ü"
+    for _ in range(500):
+        source = ie._normalize_source_text("".join(rng.choice(alphabet + " ") for _ in range(rng.randint(0, 60))))
+        candidates = [
+            ("upi_ids", None, "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 4))))
+            for _ in range(rng.randint(2, 8))
+        ]
+        with_automaton = ie._find_in_source(candidates, source)
+        monkeypatch.setattr(ie, "ahocorasick", None)
+        assert with_automaton == ie._find_in_source(candidates, source)
+        monkeypatch.undo()
@@ -0,0 +1,24 @@
+import asyncio
+
+import agents.persona_engagement as pe
+
+
+REPLY = (
+    "Why should I pay Rs. 500 now? Mr. Sharma from the branch never said this. "
+    "This looks like a red flag to me. Can you give me your employee id?"
+)
+
+
+def test_streamed_reply_with_abbreviations_is_not_cut_early(monkeypatch):
+    async def chunks():
+        for word in REPLY.split(" "):
+            yield word + " "
+
+    monkeypatch.setattr(pe, "stream_llm_async", lambda **kwargs: chunks())
+
+    history = [{"role": "scammer", "message": "Pay the Rs. 500 fine today", "turn_number": 1}]
+    persona = {"name": "Test Persona", "occupation": "Clerk", "voice": "Polite"}
+    reply = asyncio.run(pe._generate_response({"scam_type": None}, persona, history))
+
+    assert "red flag" in reply
+    assert reply.strip().endswith("employee id?")
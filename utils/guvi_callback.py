@@ -4,6 +4,7 @@ Mandatory callback to report extracted intelligence for evaluation (Section 12).
 """
 
 import httpx
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional
 from config import get_settings
@@ -13,6 +14,32 @@ logger = logging.getLogger(__name__)
 # GUVI_CALLBACK_URL = "https://hackathon.guvi.in/api/updateHoneyPotFinalResult" # Removed hardcoded URL
 CALLBACK_TIMEOUT = 10  # seconds
 
+_callback_client: Optional[httpx.AsyncClient] = None
+_callback_client_loop = None
+
+
+def _get_callback_client() -> httpx.AsyncClient:
+    """Get or create the pooled callback client. Loop-safe for tests."""
+    global _callback_client, _callback_client_loop
+    current_loop = asyncio.get_running_loop()
+
+    # Keep-alive connections are bound to the loop that opened them
+    if _callback_client is None or _callback_client.is_closed or _callback_client_loop is not current_loop:
+        _callback_client = httpx.AsyncClient(
+            timeout=CALLBACK_TIMEOUT,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=8, keepalive_expiry=30.0)
+        )
+        _callback_client_loop = current_loop
+    return _callback_client
+
+
+async def close_callback_client():
+    """Close the pooled callback client (called on app shutdown)."""
+    global _callback_client
+    if _callback_client is not None and not _callback_client.is_closed:
+        await _callback_client.aclose()
+    _callback_client = None
+
 
 async def send_guvi_callback(
     session_id: str,
@@ -90,19 +117,19 @@ async def send_guvi_callback(
     print(f"\033[95m{json.dumps(payload, indent=2)}\033[0m") # Print payload in purple directly for visibility per user request
     
     try:
-        async with httpx.AsyncClient(timeout=CALLBACK_TIMEOUT) as client:
-            response = await client.post(
-                callback_url,
-                json=payload,
-                headers={"Content-Type": "application/json"}
-            )
-            
-            if response.status_code == 200:
-                AgentLogger._print_colored("GUVI", "purple", "✅", f"Success: Status: {response.status_code}")
-                return True
-            else:
-                AgentLogger._print_colored("GUVI", "purple", "❌", f"Failed: Status: {response.status_code} | Body: {response.text}")
-                return False
+        # Pooled client: repeat callbacks reuse the TLS connection
+        response = await _get_callback_client().post(
+            callback_url,
+            json=payload,
+            headers={"Content-Type": "application/json"}
+        )
+        
+        if response.status_code == 200:
+            AgentLogger._print_colored("GUVI", "purple", "✅", f"Success: Status: {response.status_code}")
+            return True
+        else:
+            AgentLogger._print_colored("GUVI", "purple", "❌", f"Failed: Status: {response.status_code} | Body: {response.text}")
+            return False
                 
     except httpx.TimeoutException:
         AgentLogger._print_colored("GUVI", "red", "⏱️", "Timeout", f"Failed to reach {callback_url}")
@@ -1,17 +1,54 @@
+import hashlib
 import logging
 import time
 import asyncio
+import random
+import re
 import threading
-from typing import Optional, List, Dict, Union
+from typing import AsyncIterator, Optional, List, Dict, Union
 import openai
 from openai import OpenAI, AsyncOpenAI, APIError, RateLimitError, APITimeoutError
 from google import genai
 from google.genai import types
 from config import get_settings, get_model_for_agent
+from utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Retry backoff bounds (seconds)
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+# RetryInfo hint in Gemini 429 errors, e.g. 'retryDelay': '17s'
+_RETRY_DELAY_RE = re.compile(r"retry_?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", re.IGNORECASE)
+
+# Responses to calls made with cache=True, keyed by a hash of the full request.
+# Identical prompts (retried scam templates, test runs) skip the round trip.
+_DETERMINISTIC_CACHE = TTLCache(maxsize=1024, ttl=3600)
+
+
+def _backoff_delay(error: Exception, prev_delay: float) -> float:
+    """
+    Delay before the next retry: the server's retry hint when the error carries
+    one, otherwise decorrelated jitter so concurrent workers don't retry in lockstep.
+    """
+    match = _RETRY_DELAY_RE.search(str(error))
+    if match:
+        return min(RETRY_MAX_DELAY, float(match.group(1)))
+    return min(RETRY_MAX_DELAY, random.uniform(RETRY_BASE_DELAY, prev_delay * 3))
+
+
+def _log_prompt_cache_usage(response, model: str):
+    """
+    Log how much of the prompt Gemini served from its implicit prefix cache.
+    Prompts keep their static instructions first so repeated calls share a
+    cacheable prefix; this makes the hit rate visible.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    cached_tokens = getattr(usage, "cached_content_token_count", None) if usage else None
+    if cached_tokens:
+        logger.debug(f"Gemini prompt cache: {cached_tokens}/{usage.prompt_token_count} prompt tokens cached ({model})")
+
 
 class LLMClient:
     """Singleton LLM client with thread-safe initialization."""
@@ -73,8 +110,7 @@ class LLMClient:
         if use_model.lower().startswith("gpt"):
             logger.warning(f"⚠️ WARNING: Agent '{agent_name}' is attempting to use GPT model: {use_model}")
 
-        settings_local = get_settings()
-        retries = settings_local.api_retry_attempts
+        retries = settings.api_retry_attempts
         last_error = None
 
         config = types.GenerateContentConfig(
@@ -83,6 +119,7 @@ class LLMClient:
             response_mime_type="application/json" if json_mode else "text/plain"
         )
 
+        wait_time = RETRY_BASE_DELAY
         for attempt in range(retries):
             try:
                 response = self.gemini_client.models.generate_content(
@@ -90,12 +127,15 @@ class LLMClient:
                     contents=prompt,
                     config=config
                 )
+                _log_prompt_cache_usage(response, use_model)
                 return response.text
                 
             except Exception as e:
                 last_error = e
-                wait_time = 2 ** attempt
-                logger.warning(f"Gemini API Error (Attempt {attempt+1}/{retries}): {e}. Retrying in {wait_time}s...")
+                if attempt == retries - 1:
+                    break
+                wait_time = _backoff_delay(e, wait_time)
+                logger.warning(f"Gemini API Error (Attempt {attempt+1}/{retries}): {e}. Retrying in {wait_time:.1f}s...")
                 time.sleep(wait_time)
         
         logger.error(f"Failed to generate Gemini response after {retries} attempts. Last error: {last_error}")
@@ -124,8 +164,7 @@ class LLMClient:
         if use_model.lower().startswith("gpt"):
             logger.warning(f"⚠️ WARNING: Agent '{agent_name}' is attempting to use GPT model: {use_model}")
 
-        settings_local = get_settings()
-        retries = settings_local.api_retry_attempts
+        retries = settings.api_retry_attempts
         last_error = None
 
         config = types.GenerateContentConfig(
@@ -134,28 +173,81 @@ class LLMClient:
             response_mime_type="application/json" if json_mode else "text/plain"
         )
 
+        wait_time = RETRY_BASE_DELAY
         for attempt in range(retries):
             try:
-                # google-genai SDK 1.x generate_content is synchronous but can be wrapped or used if there's an async counterpart.
-                # Currently, google-genai Client.models.generate_content is synchronous.
-                # If we need true async, we might need a different approach, but for now we wrap it.
-                response = await asyncio.to_thread(
-                    self.gemini_client.models.generate_content,
+                # Native async client (Client.aio): no worker thread per call, and
+                # cancellation propagates to the underlying HTTP request
+                response = await self.gemini_client.aio.models.generate_content(
                     model=use_model,
                     contents=prompt,
                     config=config
                 )
+                _log_prompt_cache_usage(response, use_model)
                 return response.text
                 
             except Exception as e:
                 last_error = e
-                wait_time = 2 ** attempt
-                logger.warning(f"Async Gemini API Error (Attempt {attempt+1}/{retries}): {e}. Retrying in {wait_time}s...")
+                if attempt == retries - 1:
+                    break
+                wait_time = _backoff_delay(e, wait_time)
+                logger.warning(f"Async Gemini API Error (Attempt {attempt+1}/{retries}): {e}. Retrying in {wait_time:.1f}s...")
                 await asyncio.sleep(wait_time)
         
         logger.error(f"Failed to generate async Gemini response after {retries} attempts. Last error: {last_error}")
         raise last_error or Exception("Unknown error in Gemini generation")
 
+    async def stream_response_async(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        agent_name: Optional[str] = None,
+        temperature: float = 0.0
+    ) -> AsyncIterator[str]:
+        """
+        Stream a plain-text Gemini response chunk by chunk. Retries (same
+        backoff as generate_response_async) only until the first chunk
+        arrives; closing the generator early cancels the request.
+        """
+        use_model = get_model_for_agent(agent_name) if agent_name else (settings.planner_model or "gemini-2.0-flash")
+
+        retries = settings.api_retry_attempts
+        last_error = None
+
+        config = types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            temperature=temperature,
+            response_mime_type="text/plain"
+        )
+
+        wait_time = RETRY_BASE_DELAY
+        for attempt in range(retries):
+            started = False
+            try:
+                stream = await self.gemini_client.aio.models.generate_content_stream(
+                    model=use_model,
+                    contents=prompt,
+                    config=config
+                )
+                async for chunk in stream:
+                    if chunk.text:
+                        started = True
+                        yield chunk.text
+                return
+
+            except Exception as e:
+                if started:
+                    raise  # Partial output already delivered; cannot retry transparently
+                last_error = e
+                if attempt == retries - 1:
+                    break
+                wait_time = _backoff_delay(e, wait_time)
+                logger.warning(f"Gemini stream error (Attempt {attempt+1}/{retries}): {e}. Retrying in {wait_time:.1f}s...")
+                await asyncio.sleep(wait_time)
+
+        logger.error(f"Failed to stream Gemini response after {retries} attempts. Last error: {last_error}")
+        raise last_error or Exception("Unknown error in Gemini generation")
+
     async def get_embedding(self, text: str) -> List[float]:
         """Generate embedding for text using OpenAI (STRICT)."""
         if not text:
@@ -193,6 +285,18 @@ class LLMClient:
             raise e
 
 
+def _deterministic_key(
+    prompt: str,
+    system_instruction: Optional[str],
+    json_mode: bool,
+    agent_name: Optional[str]
+) -> str:
+    """Cache key for a request made with cache=True."""
+    model = get_model_for_agent(agent_name) if agent_name else (settings.planner_model or "gemini-2.0-flash")
+    raw = "\x00".join((model, system_instruction or "", str(json_mode), prompt))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
 # Global instance
 _client_instance = None
 
@@ -209,7 +313,8 @@ def call_llm(
     system_instruction: Optional[str] = None, 
     json_mode: bool = False,
     agent_name: Optional[str] = None,
-    temperature: float = 0.0
+    temperature: float = 0.0,
+    cache: bool = False
 ) -> str:
     """
     Helper function to call the singleton client (Gemini for agents).
@@ -219,15 +324,24 @@ def call_llm(
         system_instruction: System instruction
         json_mode: Whether to force JSON response
         agent_name: Agent name for automatic model selection
+        cache: Reuse the response for identical requests (temperature=0 only)
     """
+    key = _deterministic_key(prompt, system_instruction, json_mode, agent_name) if cache and temperature == 0 else None
+    if key is not None:
+        cached = _DETERMINISTIC_CACHE.get(key)
+        if cached is not None:
+            return cached
     client = get_llm_client()
-    return client.generate_response(
+    response = client.generate_response(
         prompt=prompt, 
         system_instruction=system_instruction, 
         json_mode=json_mode,
         agent_name=agent_name,
         temperature=temperature
     )
+    if key is not None and response:
+        _DETERMINISTIC_CACHE.set(key, response)
+    return response
 
 
 async def call_llm_async(
@@ -235,17 +349,42 @@ async def call_llm_async(
     system_instruction: Optional[str] = None, 
     json_mode: bool = False,
     agent_name: Optional[str] = None,
-    temperature: float = 0.0
+    temperature: float = 0.0,
+    cache: bool = False
 ) -> str:
-    """Helper function for async Gemini calls."""
+    """Helper function for async Gemini calls. cache=True reuses responses to identical temperature=0 requests."""
+    key = _deterministic_key(prompt, system_instruction, json_mode, agent_name) if cache and temperature == 0 else None
+    if key is not None:
+        cached = _DETERMINISTIC_CACHE.get(key)
+        if cached is not None:
+            return cached
     client = get_llm_client()
-    return await client.generate_response_async(
+    response = await client.generate_response_async(
         prompt=prompt, 
         system_instruction=system_instruction, 
         json_mode=json_mode,
         agent_name=agent_name,
         temperature=temperature
     )
+    if key is not None and response:
+        _DETERMINISTIC_CACHE.set(key, response)
+    return response
+
+
+def stream_llm_async(
+    prompt: str,
+    system_instruction: Optional[str] = None,
+    agent_name: Optional[str] = None,
+    temperature: float = 0.0
+) -> AsyncIterator[str]:
+    """Helper to stream a plain-text Gemini response as text chunks."""
+    client = get_llm_client()
+    return client.stream_response_async(
+        prompt=prompt,
+        system_instruction=system_instruction,
+        agent_name=agent_name,
+        temperature=temperature
+    )
 
 
 async def get_embedding(text: str) -> List[float]:
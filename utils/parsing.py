@@ -5,10 +5,17 @@ Shared parsing utilities for the Agentic Honey-Pot system.
 import json
 import logging
 import re
-from typing import Dict, Any
+import orjson
+from string import Formatter
+from typing import Dict, Any, Callable
 
 logger = logging.getLogger(__name__)
 
+# Content between ```json and ``` or just ``` and ```
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+# Outermost {...} when there is text before or after the JSON object
+_JSON_OBJECT_RE = re.compile(r"(\{.*\})", re.DOTALL)
+
 def parse_json_safely(response_text: str) -> Dict[str, Any]:
     """
     Safely parse JSON response from LLM with robust cleaning.
@@ -19,8 +26,7 @@ def parse_json_safely(response_text: str) -> Dict[str, Any]:
 
     # Handle markdown code blocks
     if "```" in response_text:
-        # Match content between ```json and ``` or just ``` and ```
-        match = re.search(r"```(?:json)?\s*(.*?)\s*```", response_text, re.DOTALL)
+        match = _FENCE_RE.search(response_text)
         if match:
             response_text = match.group(1)
         else:
@@ -29,6 +35,12 @@ def parse_json_safely(response_text: str) -> Dict[str, Any]:
     
     response_text = response_text.strip()
     
+    # Fast path; stdlib json below keeps its leniency (NaN, >64-bit ints) and error reporting
+    try:
+        return orjson.loads(response_text)
+    except orjson.JSONDecodeError:
+        pass
+    
     try:
         return json.loads(response_text)
     except json.JSONDecodeError as e:
@@ -37,10 +49,34 @@ def parse_json_safely(response_text: str) -> Dict[str, Any]:
         # Try a more aggressive cleanup if simple parsing fails
         # Sometimes there's text before or after the JSON object
         try:
-            match = re.search(r"(\{.*\})", response_text, re.DOTALL)
+            match = _JSON_OBJECT_RE.search(response_text)
             if match:
                 return json.loads(match.group(1))
         except Exception:
             pass
             
         return {}
+
+
+def compile_prompt_template(template: str) -> Callable[..., str]:
+    """
+    Pre-split a str.format template into literal chunks and field names once.
+    The returned renderer(**fields) gives the same text as template.format(**fields)
+    without re-scanning the template on every call. Fields may carry a plain
+    format spec such as {score:.2f}; conversions and nested specs are not supported.
+    """
+    parts = []
+    for literal, field, spec, conversion in Formatter().parse(template):
+        if conversion or (spec and "{" in spec):
+            raise ValueError(f"Unsupported conversion or nested spec on field {field!r}")
+        parts.append((literal, field, spec or None))
+    parts = tuple(parts)
+
+    def render(**fields: Any) -> str:
+        return "".join([
+            literal if field is None
+            else literal + (str(fields[field]) if spec is None else format(fields[field], spec))
+            for literal, field, spec in parts
+        ])
+
+    return render
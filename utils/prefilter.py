@@ -6,6 +6,7 @@ Reduces latency, cost, and hallucination surface.
 
 import re
 import logging
+from functools import lru_cache
 from typing import Dict, Any, Tuple, List, Set
 
 logger = logging.getLogger(__name__)
@@ -118,6 +119,14 @@ ENTITY_PATTERNS: Dict[str, List[str]] = {
     ],
 }
 
+# Compiled once at import (IGNORECASE as extraction always applied it)
+COMPILED_ENTITY_PATTERNS: Dict[str, List[re.Pattern]] = {
+    entity_type: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for entity_type, patterns in ENTITY_PATTERNS.items()
+}
+_WHITESPACE_RE = re.compile(r'\s+')
+_NON_DIGIT_RE = re.compile(r'\D')
+
 
 def prefilter_scam_detection(message: str) -> Tuple[bool, str, float, List[str]]:
     """
@@ -176,28 +185,15 @@ def prefilter_scam_detection(message: str) -> Tuple[bool, str, float, List[str]]
     return (is_obvious, best_type, best_score, all_indicators[:5])
 
 
-def extract_entities_deterministic(text: str) -> Dict[str, List[Dict[str, Any]]]:
-    """
-    Deterministic regex-based entity extraction.
-    Returns entities with confidence and source attribution.
-    
-    Args:
-        text: Text to extract entities from
-        
-    Returns:
-        Dict with entity types as keys and lists of entity dicts
-    """
-    entities: Dict[str, List[Dict[str, Any]]] = {}
-    
-    for entity_type, patterns in ENTITY_PATTERNS.items():
+def _extract_entity_values(text: str) -> Dict[str, List[str]]:
+    """Cleaned, filtered regex matches per entity type (unordered, de-duplicated)."""
+    values: Dict[str, List[str]] = {}
+    for entity_type, patterns in COMPILED_ENTITY_PATTERNS.items():
         matches: Set[str] = set()
-        
         for pattern in patterns:
-            found = re.findall(pattern, text, re.IGNORECASE)
-            matches.update(found)
+            matches.update(pattern.findall(text))
         
-        # Create entity objects with metadata
-        entity_list = []
+        clean_values = []
         for match in matches:
             # Handle findall returning tuples (when capturing groups are used)
             if isinstance(match, tuple):
@@ -206,25 +202,47 @@ def extract_entities_deterministic(text: str) -> Dict[str, List[Dict[str, Any]]]
             # Clean and normalize
             clean_match = str(match).strip()
             if entity_type == "bank_accounts":
-                clean_match = re.sub(r'\s+', '', clean_match)  # Remove spaces
+                clean_match = _WHITESPACE_RE.sub('', clean_match)  # Remove spaces
             
             # Skip obvious false positives
             if entity_type == "bank_accounts" and len(clean_match) < 9:
                 continue
-            if entity_type == "phone_numbers" and len(re.sub(r'\D', '', clean_match)) < 10:
+            if entity_type == "phone_numbers" and len(_NON_DIGIT_RE.sub('', clean_match)) < 10:
                 continue
             if entity_type in ("case_ids", "policy_numbers", "order_numbers"):
                 # Must contain at least one digit and be >= 4 chars
                 if len(clean_match) < 4 or not any(c.isdigit() for c in clean_match):
                     continue
-                
-            entity_list.append({
-                "value": clean_match,
+            
+            clean_values.append(clean_match)
+        
+        values[entity_type] = clean_values
+    
+    return values
+
+
+# Per-message results are pure on the text, so earlier turns are never rescanned.
+# Cached values are tuples; records are built fresh because callers mutate them.
+@lru_cache(maxsize=4096)
+def _message_entity_values(message: str) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    return tuple(
+        (entity_type, tuple(values))
+        for entity_type, values in _extract_entity_values(message).items()
+    )
+
+
+def _to_entity_records(values: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    entities = {
+        entity_type: [
+            {
+                "value": value,
                 "confidence": 1.0,  # Regex matches are explicit
                 "source": "explicit"
-            })
-        
-        entities[entity_type] = entity_list
+            }
+            for value in entity_values
+        ]
+        for entity_type, entity_values in values.items()
+    }
     
     total = sum(len(v) for v in entities.values())
     logger.debug(f"PREFILTER EXTRACTION: Found {total} entities via regex")
@@ -232,6 +250,40 @@ def extract_entities_deterministic(text: str) -> Dict[str, List[Dict[str, Any]]]
     return entities
 
 
+def extract_entities_deterministic(text: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Deterministic regex-based entity extraction.
+    Returns entities with confidence and source attribution.
+    
+    Args:
+        text: Text to extract entities from
+        
+    Returns:
+        Dict with entity types as keys and lists of entity dicts
+    """
+    return _to_entity_records(_extract_entity_values(text))
+
+
+def extract_entities_from_messages(messages: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Deterministic extraction over a list of messages (e.g. every scammer turn).
+    Each message is scanned once and memoized, so turn N only scans the new
+    message instead of the whole corpus. Matches never span two messages.
+    
+    Args:
+        messages: Message texts, oldest first
+        
+    Returns:
+        Dict with entity types as keys and lists of entity dicts
+    """
+    # dicts as insertion-ordered sets
+    values: Dict[str, Dict[str, None]] = {entity_type: {} for entity_type in COMPILED_ENTITY_PATTERNS}
+    for message in messages:
+        for entity_type, entity_values in _message_entity_values(message):
+            values[entity_type].update(dict.fromkeys(entity_values))
+    return _to_entity_records(values)
+
+
 def merge_entities(regex_entities: Dict, llm_entities: Dict) -> Dict[str, List[Dict[str, Any]]]:
     """
     Merge regex-extracted and LLM-verified entities using the specialized 